@@ -528,6 +528,10 @@ class StoryProcessor:
                     # Create Word document
                     docx_file = rewritten_story_folder / f"Story_{story_info['folder_name']}.docx"
                     self.create_word_document(story_text, metadata, str(docx_file))
+                    
+                    # Files above may be overwritten in place; touch the folder so the TTS step's
+                    # scan cache (keyed on folder mtimes) sees the new text and title
+                    os.utime(rewritten_story_folder)
 
                     saved_count += 1
                     
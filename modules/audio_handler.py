@@ -2,8 +2,11 @@
 Audio Handler Module
 """
 
+import shutil
 from pathlib import Path
 
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+
 def scan_folder_for_videos(folder_path):
     """Scan folder for video files"""
     video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv']
@@ -36,6 +39,7 @@ def scan_folder_for_audios(folder_path):
 
 def save_uploaded_file(uploaded_file, destination_path):
     """Save uploaded file to destination"""
-    with open(destination_path, "wb") as f:
-        f.write(uploaded_file.read())
+    uploaded_file.seek(0)
+    with open(destination_path, "wb", buffering=0) as f:
+        shutil.copyfileobj(uploaded_file, f, length=COPY_BUFFER_SIZE)
     return str(destination_path)
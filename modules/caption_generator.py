@@ -7,10 +7,21 @@ from datetime import timedelta
 from pathlib import Path
 from faster_whisper import WhisperModel
 
+try:
+    from faster_whisper import BatchedInferencePipeline
+except ImportError:
+    BatchedInferencePipeline = None
+
 def load_whisper_model(model_size="base", device="cpu", compute_type="int8"):
     """Load Faster-Whisper model"""
     return WhisperModel(model_size, device=device, compute_type=compute_type)
 
+def load_batched_pipeline(model):
+    """Wrap model in a batched inference pipeline (falls back to the plain model on older faster-whisper)"""
+    if BatchedInferencePipeline is None:
+        return model
+    return BatchedInferencePipeline(model=model)
+
 def chunk_text_by_words(text, max_words=5):
     """Split text into chunks of 4-5 words"""
     words = text.split()
@@ -28,14 +39,19 @@ def chunk_text_by_words(text, max_words=5):
     
     return chunks
 
-def transcribe_audio(model, audio_path, language=None):
+def transcribe_audio(model, audio_path, language=None, batch_size=8):
     """Transcribe audio using Whisper model and chunk into 4-5 word segments"""
+    kwargs = {}
+    if BatchedInferencePipeline is not None and isinstance(model, BatchedInferencePipeline):
+        kwargs['batch_size'] = batch_size
+    
     segments, info = model.transcribe(
         str(audio_path),
         language=language,
         beam_size=5,
         vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=500)
+        vad_parameters=dict(min_silence_duration_ms=500),
+        **kwargs
     )
     
     chunked_segments = []
@@ -4,7 +4,10 @@ Video Overlay Module - GPU ONLY (No CPU Fallback)
 Requires NVIDIA GPU with CUDA support
 """
 
+import os
+import shutil
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -12,7 +15,14 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 def get_video_duration(video_path):
-    """Get video duration in seconds"""
+    """Get video duration in seconds (cached per file version)"""
+    stat = os.stat(video_path)
+    return _cached_video_duration(str(video_path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=512)
+def _cached_video_duration(video_path, mtime_ns, size):
+    """Probe duration once per (path, mtime, size)"""
     cmd = [
         "ffprobe", "-v", "error",
         "-show_entries", "format=duration",
@@ -42,7 +52,8 @@ def apply_video_overlay_smart(
     green_blend=0.1,
     keep_overlay_audio=False,
     quality_preset="high_quality",
-    optimize=True
+    optimize=True,
+    gpu_id=0
 ):
     """
     Apply video overlay with GPU - Full video encoding
@@ -62,6 +73,7 @@ def apply_video_overlay_smart(
         keep_overlay_audio: Mix both audios (True) or keep only main video audio (False)
         quality_preset: Quality preset
         optimize: Unused parameter (kept for compatibility)
+        gpu_id: Index of the GPU to decode, filter and encode on
     
     Returns:
         Path to output video
@@ -87,6 +99,14 @@ def apply_video_overlay_smart(
     
     logger.info(f"Main video duration: {main_duration}s")
     logger.info(f"Overlay segment: {actual_start}s to {actual_end}s ({overlay_segment_duration}s)")
+    
+    # Empty window (video ends before the overlay starts, or end <= start): trim would reject
+    # a negative duration and treat 0 as unlimited, so the main video is passed through as is
+    if overlay_segment_duration <= 0:
+        logger.warning("Overlay window is empty, copying main video without overlay")
+        shutil.copyfile(main_video_path, output_path)
+        return str(output_path)
+    
     logger.info("Using full GPU encode method")
     
     # Always use full GPU encode
@@ -94,7 +114,7 @@ def apply_video_overlay_smart(
         main_video_path, overlay_video_path, output_path,
         actual_start, actual_end,
         position, size_percent, remove_green, green_similarity,
-        green_blend, keep_overlay_audio, quality_preset
+        green_blend, keep_overlay_audio, quality_preset, gpu_id
     )
 
 
@@ -102,10 +122,13 @@ def _apply_overlay_full_encode(
     main_video_path, overlay_video_path, output_path,
     start_time, end_time,
     position, size_percent, remove_green, green_similarity,
-    green_blend, keep_overlay_audio, quality_preset
+    green_blend, keep_overlay_audio, quality_preset, gpu_id=0
 ):
     """
-    Full GPU overlay method (entire video encoding)
+    Full GPU overlay method (entire video encoding, frames stay in VRAM)
+    
+    The overlay clip is trimmed to the window and shifted to start_time, so it
+    plays from its first frame at start_time (overlay_cuda has no enable= support).
     
     Audio Behavior:
     - keep_overlay_audio=False: Keep only main video audio, remove overlay audio
@@ -114,29 +137,38 @@ def _apply_overlay_full_encode(
     
     logger.info("Applying GPU overlay using full encode method")
     
-    # Build video filter complex
-    scale_filter = f"scale=iw*{size_percent/100}:ih*{size_percent/100}"
+    # Build video filter complex (CUDA filters only)
+    scale = size_percent / 100
+    scale_filter = f"scale_cuda=trunc(iw*{scale}/2)*2:trunc(ih*{scale}/2)*2"
+    window = f"trim=duration={end_time - start_time},setpts=PTS-STARTPTS+{start_time}/TB"
     
     position_map = {
-        "top_left": "10:10",
-        "top_right": "main_w-overlay_w-10:10",
-        "bottom_left": "10:main_h-overlay_h-10",
-        "bottom_right": "main_w-overlay_w-10:main_h-overlay_h-10",
-        "center": "(main_w-overlay_w)/2:(main_h-overlay_h)/2"
+        "top_left": ("10", "10"),
+        "top_right": ("main_w-overlay_w-10", "10"),
+        "bottom_left": ("10", "main_h-overlay_h-10"),
+        "bottom_right": ("main_w-overlay_w-10", "main_h-overlay_h-10"),
+        "center": ("(main_w-overlay_w)/2", "(main_h-overlay_h)/2")
     }
-    overlay_position = position_map.get(position, "10:10")
+    overlay_x, overlay_y = position_map.get(position, ("10", "10"))
     
-    # Video overlay filter
+    # Video overlay filter: main is decoded into VRAM, overlay is uploaded once
+    overlay_filter = f"[1:v]{window},format=yuv420p,hwupload,{scale_filter}"
     if remove_green:
-        chroma_key = f"colorkey=0x00FF00:{green_similarity}:{green_blend}"
-        video_filter = f"[1:v]format=yuv420p,{scale_filter},{chroma_key}[ovr];[0:v][ovr]overlay={overlay_position}:enable='between(t,{start_time},{end_time})'[vout]"
-    else:
-        video_filter = f"[1:v]format=yuv420p,{scale_filter}[ovr];[0:v][ovr]overlay={overlay_position}:enable='between(t,{start_time},{end_time})'[vout]"
+        overlay_filter += f",chromakey_cuda=color=0x00FF00:similarity={green_similarity}:blend={green_blend}"
+    video_filter = (
+        f"{overlay_filter}[ovr];"
+        f"[0:v]scale_cuda=format=yuv420p[main];"
+        f"[main][ovr]overlay_cuda=x={overlay_x}:y={overlay_y}:eof_action=pass[vout]"
+    )
     
     # Audio handling
     if keep_overlay_audio:
-        # Mix both audios: main video audio + overlay audio
-        filter_complex = video_filter + ";[0:a][1:a]amix=inputs=2:duration=first:dropout_transition=2[aout]"
+        # Mix both audios: main video audio + overlay audio (aligned with the overlay window)
+        delay_ms = int(start_time * 1000)
+        filter_complex = video_filter + (
+            f";[1:a]atrim=duration={end_time - start_time},asetpts=PTS-STARTPTS,adelay={delay_ms}:all=1[oa]"
+            ";[0:a][oa]amix=inputs=2:duration=first:dropout_transition=2[aout]"
+        )
         audio_map = ["-map", "[vout]", "-map", "[aout]"]
         logger.info("Audio: Mixing main video audio + overlay audio")
     else:
@@ -157,6 +189,12 @@ def _apply_overlay_full_encode(
     # Build FFmpeg command
     cmd = [
         "ffmpeg", "-y",
+        "-init_hw_device", f"cuda=g:{gpu_id}",
+        "-filter_hw_device", "g",
+        "-hwaccel", "cuda",
+        "-hwaccel_device", "g",
+        "-hwaccel_output_format", "cuda",
+        "-extra_hw_frames", "16",
         "-i", str(main_video_path),
         "-i", str(overlay_video_path),
         "-filter_complex", filter_complex
@@ -174,7 +212,8 @@ def _apply_overlay_full_encode(
         "-cq", selected["cq"],
         "-profile:v", "high",
         "-spatial-aq", "1",
-        "-temporal-aq", "1"
+        "-temporal-aq", "1",
+        "-gpu", str(gpu_id)
     ])
     
     # Audio encoding
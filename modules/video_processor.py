@@ -4,8 +4,10 @@ Video Processor Module - GPU ONLY (No CPU Fallback)
 Includes auto single/parallel detection, time tracking, and stream copy optimization
 """
 
+import os
 import subprocess
 import multiprocessing
+from functools import lru_cache
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
@@ -15,6 +17,17 @@ import time
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def cuda_input_args(gpu_id=0):
+    """FFmpeg options for one named CUDA device that decodes the next input straight into VRAM"""
+    return [
+        "-init_hw_device", f"cuda=g:{gpu_id}",
+        "-filter_hw_device", "g",
+        "-hwaccel", "cuda",
+        "-hwaccel_device", "g",
+        "-hwaccel_output_format", "cuda",
+        "-extra_hw_frames", "8"
+    ]
+
 def check_gpu_available():
     """Check if NVIDIA GPU encoding is available"""
     try:
@@ -29,6 +42,23 @@ def check_gpu_available():
     except:
         return False
 
+@lru_cache(maxsize=1)
+def get_gpu_count():
+    """Number of NVIDIA GPUs reported by nvidia-smi (at least 1)"""
+    try:
+        result = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index", "--format=csv,noheader"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=10
+        )
+        if result.returncode == 0:
+            return max(1, sum(1 for line in result.stdout.splitlines() if line.strip()))
+    except:
+        pass
+    return 1
+
 def check_ffmpeg_available():
     """Check ffmpeg and ffprobe availability"""
     try:
@@ -39,7 +69,13 @@ def check_ffmpeg_available():
         return False, str(e)
 
 def get_media_duration(path):
-    """Get duration in seconds"""
+    """Get duration in seconds (cached per file version)"""
+    stat = os.stat(path)
+    return _cached_duration(str(path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=512)
+def _cached_duration(path, mtime_ns, size):
+    """Probe duration once per (path, mtime, size)"""
     cmd = [
         "ffprobe", "-v", "error",
         "-show_entries", "format=duration",
@@ -55,7 +91,13 @@ def get_media_duration(path):
         raise RuntimeError("Unable to parse duration")
 
 def get_video_resolution(path):
-    """Get video resolution (width, height)"""
+    """Get video resolution (width, height) (cached per file version)"""
+    stat = os.stat(path)
+    return _cached_resolution(str(path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=512)
+def _cached_resolution(path, mtime_ns, size):
+    """Probe resolution once per (path, mtime, size)"""
     cmd = [
         "ffprobe", "-v", "error",
         "-select_streams", "v:0",
@@ -72,6 +114,78 @@ def get_video_resolution(path):
     except ValueError:
         raise RuntimeError("Unable to parse video resolution")
 
+def get_video_format(path):
+    """Get (codec_name, pix_fmt) of the first video stream (cached per file version)"""
+    stat = os.stat(path)
+    return _cached_video_format(str(path), stat.st_mtime_ns, stat.st_size)
+
+@lru_cache(maxsize=512)
+def _cached_video_format(path, mtime_ns, size):
+    """Probe codec and pixel format once per (path, mtime, size)"""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,pix_fmt",
+        "-of", "csv=p=0",
+        str(path)
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=30)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe error getting video format: {result.stderr.decode(errors='ignore')}")
+    try:
+        codec_name, pix_fmt = result.stdout.decode().strip().split(',')[:2]
+        return codec_name, pix_fmt
+    except ValueError:
+        raise RuntimeError("Unable to parse video format")
+
+def prepare_background_video(input_path, cache_dir, gpu_id=0):
+    """
+    Transcode a background video once into NVDEC-friendly 1080p H.264 yuv420p
+    
+    Returns the input path unchanged if it is already H.264/HEVC yuv420p,
+    otherwise the path of the cached transcode (reused while newer than the source)
+    """
+    codec_name, pix_fmt = get_video_format(input_path)
+    if codec_name in ("h264", "hevc") and pix_fmt == "yuv420p":
+        return str(input_path)
+    
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cached_path = cache_dir / f"{Path(input_path).name}.mp4"
+    if cached_path.exists() and cached_path.stat().st_mtime >= os.stat(input_path).st_mtime:
+        return str(cached_path)
+    
+    width, height = get_video_resolution(input_path)
+    
+    temp_path = cache_dir / f"{Path(input_path).name}.part.mp4"
+    cmd = [
+        "ffmpeg", "-y",
+        "-hwaccel", "auto",
+        "-i", str(input_path),
+        "-map", "0:v:0",
+        "-an"
+    ]
+    if width != 1920 or height != 1080:
+        cmd += ["-vf", "scale=1920:1080"]
+    cmd += [
+        "-c:v", "h264_nvenc",
+        "-preset", "p4",
+        "-cq", "20",
+        "-g", "60",
+        "-pix_fmt", "yuv420p",
+        "-gpu", str(gpu_id),
+        str(temp_path)
+    ]
+    
+    logger.info(f"GPU pre-transcoding background ({codec_name}/{pix_fmt}): {input_path} -> {cached_path}")
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=3600)
+    if result.returncode != 0:
+        Path(temp_path).unlink(missing_ok=True)
+        raise RuntimeError(f"GPU background transcode failed: {result.stderr.decode(errors='ignore')}")
+    
+    os.replace(temp_path, cached_path)
+    return str(cached_path)
+
 def format_time(seconds):
     """Format seconds into human-readable time"""
     if seconds < 60:
@@ -85,7 +199,7 @@ def format_time(seconds):
         mins = int((seconds % 3600) // 60)
         return f"{hours}h {mins}m"
 
-def scale_video_to_1080p(input_path, output_path, quality_preset="high_quality"):
+def scale_video_to_1080p(input_path, output_path, quality_preset="high_quality", gpu_id=0):
     """Scale video to 1080p using GPU - NO CPU FALLBACK"""
     width, height = get_video_resolution(input_path)
     if width == 1920 and height == 1080:
@@ -131,8 +245,9 @@ def scale_video_to_1080p(input_path, output_path, quality_preset="high_quality")
     # GPU-accelerated encoding with hardware decoding
     cmd = [
         "ffmpeg", "-y",
+        *cuda_input_args(gpu_id),
         "-i", str(input_path),
-        "-vf", "scale=1920:1080",
+        "-vf", "scale_cuda=1920:1080:format=nv12",
         "-map", "0:v",
         "-map", "0:a?",  # Include audio if present
         "-c:v", "h264_nvenc",
@@ -145,7 +260,7 @@ def scale_video_to_1080p(input_path, output_path, quality_preset="high_quality")
         "-spatial-aq", spatial_aq,
         "-temporal-aq", temporal_aq,
         "-bf", "3",
-        "-gpu", "0"
+        "-gpu", str(gpu_id)
     ]
     
     # Add multipass if enabled
@@ -166,76 +281,94 @@ def scale_video_to_1080p(input_path, output_path, quality_preset="high_quality")
     logger.info(f"Successfully GPU-scaled video: {output_path}")
     return str(output_path)
 
-def loop_video_to_match_audio(video_path, audio_path, output_path, quality_preset="high_quality"):
+def loop_video_to_match_audio(video_path, audio_path, output_path, quality_preset="high_quality", audio_dur=None, gpu_id=0):
     """Loop video to match audio duration with GPU encoding and timing tracking"""
     start_time = time.time()
     logger.info(f"GPU processing video loop: {video_path} with audio: {audio_path}")
     
-    # First, scale the input video to 1080p if it's not already (GPU)
-    scaled_video_path = Path(output_path).parent / f"scaled_input_{Path(video_path).name}"
-    processed_video_path = scale_video_to_1080p(video_path, scaled_video_path, quality_preset)
+    if audio_dur is None:
+        audio_dur = get_media_duration(audio_path)
+    width, height = get_video_resolution(video_path)
     
-    video_dur = get_media_duration(processed_video_path)
-    audio_dur = get_media_duration(audio_path)
+    logger.info(f"Audio duration: {audio_dur}s, looping on input side")
     
-    logger.info(f"Video duration: {video_dur}s, Audio duration: {audio_dur}s")
+    # GPU-ONLY quality presets
+    quality_settings = {
+        "ultra_fast": {
+            "gpu_preset": "p4",
+            "cq": "23",
+            "multipass": "disabled",
+            "spatial_aq": "0",
+            "temporal_aq": "0",
+            "audio_bitrate": "256k"
+        },
+        "high_quality": {
+            "gpu_preset": "p6",
+            "cq": "19",
+            "multipass": "fullres",
+            "spatial_aq": "1",
+            "temporal_aq": "1",
+            "audio_bitrate": "320k"
+        },
+        "maximum_quality": {
+            "gpu_preset": "p7",
+            "cq": "17",
+            "multipass": "fullres",
+            "spatial_aq": "1",
+            "temporal_aq": "1",
+            "audio_bitrate": "320k"
+        }
+    }
     
-    if audio_dur <= video_dur:
-        logger.info("Audio shorter than video, combining directly with GPU")
-        result = combine_video_audio(processed_video_path, audio_path, output_path, quality_preset)
-        # Clean up scaled video if it was created
-        if str(processed_video_path) != str(video_path):
-            try:
-                Path(processed_video_path).unlink()
-            except:
-                pass
-        
-        elapsed_time = time.time() - start_time
-        logger.info(f"GPU processing completed in {format_time(elapsed_time)}")
-        return result, elapsed_time
+    selected_quality = quality_settings.get(quality_preset, quality_settings["high_quality"])
     
-    loops_needed = int(audio_dur / video_dur) + 1
-    logger.info(f"Looping video {loops_needed} times to match audio duration")
+    # Loop and trim on the input side so only audio_dur worth of frames reach NVENC
+    cmd = [
+        "ffmpeg", "-y",
+        *cuda_input_args(gpu_id),
+        "-stream_loop", "-1", "-i", str(video_path),
+        "-i", str(audio_path),
+        "-map", "0:v",
+        "-map", "1:a"
+    ]
     
-    concat_file = Path(output_path).parent / "concat_list.txt"
-    with open(concat_file, "w") as f:
-        for _ in range(loops_needed):
-            f.write(f"file '{Path(processed_video_path).resolve()}'\n")
+    # Scale to 1080p in the same pass if needed
+    if width != 1920 or height != 1080:
+        cmd += ["-vf", "scale_cuda=1920:1080:format=nv12"]
     
-    temp_looped = Path(output_path).parent / "temp_looped.mp4"
-    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(concat_file), "-c", "copy", str(temp_looped)]
+    cmd += [
+        "-c:v", "h264_nvenc",
+        "-preset", selected_quality["gpu_preset"],
+        "-tune", "hq",
+        "-profile:v", "high",
+        "-rc", "vbr",
+        "-cq", selected_quality["cq"],
+        "-rc-lookahead", "32",
+        "-spatial-aq", selected_quality["spatial_aq"],
+        "-temporal-aq", selected_quality["temporal_aq"],
+        "-bf", "3",
+        "-gpu", str(gpu_id)
+    ]
     
-    logger.info("Concatenating video loops (stream copy)")
-    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=3600)
-    if result.returncode != 0:
-        raise RuntimeError(f"Video looping failed: {result.stderr.decode(errors='ignore')}")
+    # Add multipass if enabled
+    if selected_quality["multipass"] != "disabled":
+        cmd += ["-multipass", selected_quality["multipass"]]
     
-    trimmed_video = Path(output_path).parent / "temp_trimmed.mp4"
-    cmd = ["ffmpeg", "-y", "-i", str(temp_looped), "-t", str(audio_dur), "-c", "copy", str(trimmed_video)]
+    # For maximum quality, enable additional features
+    if quality_preset == "maximum_quality":
+        cmd += ["-b_ref_mode", "middle", "-dpb_size", "4"]
+    
+    cmd += ["-c:a", "aac", "-b:a", selected_quality["audio_bitrate"], "-t", str(audio_dur), str(output_path)]
     
-    logger.info("Trimming looped video to match audio duration (stream copy)")
     result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=3600)
     if result.returncode != 0:
-        raise RuntimeError(f"Video trimming failed: {result.stderr.decode(errors='ignore')}")
-    
-    logger.info("Combining trimmed video with audio using GPU")
-    final_result = combine_video_audio(trimmed_video, audio_path, output_path, quality_preset)
-    
-    # Cleanup temporary files
-    try:
-        Path(concat_file).unlink()
-        Path(temp_looped).unlink()
-        Path(trimmed_video).unlink()
-        if str(processed_video_path) != str(video_path):
-            Path(processed_video_path).unlink()
-    except Exception as e:
-        logger.warning(f"Cleanup warning: {e}")
+        raise RuntimeError(f"Video looping failed: {result.stderr.decode(errors='ignore')}")
     
     elapsed_time = time.time() - start_time
     logger.info(f"Successfully created final video with GPU in {format_time(elapsed_time)}: {output_path}")
-    return final_result, elapsed_time
+    return str(output_path), elapsed_time
 
-def combine_video_audio(video_path, audio_path, output_path, quality_preset="high_quality"):
+def combine_video_audio(video_path, audio_path, output_path, quality_preset="high_quality", gpu_id=0):
     """Combine video and audio using GPU - NO CPU FALLBACK"""
     # GPU-ONLY quality presets
     quality_settings = {
@@ -277,6 +410,7 @@ def combine_video_audio(video_path, audio_path, output_path, quality_preset="hig
     # GPU-accelerated encoding with hardware decoding
     cmd = [
         "ffmpeg", "-y",
+        *cuda_input_args(gpu_id),
         "-i", str(video_path),
         "-i", str(audio_path),
         "-map", "0:v",
@@ -291,7 +425,7 @@ def combine_video_audio(video_path, audio_path, output_path, quality_preset="hig
         "-spatial-aq", spatial_aq,
         "-temporal-aq", temporal_aq,
         "-bf", "3",
-        "-gpu", "0"
+        "-gpu", str(gpu_id)
     ]
     
     # Add multipass if enabled
@@ -312,6 +446,194 @@ def combine_video_audio(video_path, audio_path, output_path, quality_preset="hig
     logger.info(f"Successfully GPU-combined video and audio: {output_path}")
     return str(output_path)
 
+def process_story_single_pass(video_path, audio_path, subtitle_path, output_path,
+                              quality_preset="high_quality", overlay_path=None, overlay_settings=None, gpu_id=0,
+                              mux_subtitles=False):
+    """
+    Loop, subtitle and overlay a story video in a single FFmpeg pass (one NVENC encode)
+
+    Args:
+        video_path: Path to background video (looped to audio length)
+        audio_path: Path to story audio
+        subtitle_path: Path to ASS subtitle file to burn in
+        output_path: Path for output file
+        quality_preset: Quality preset string
+        overlay_path: Optional path to overlay video
+        overlay_settings: Dictionary with overlay timing/position/green screen settings
+        gpu_id: Index of the GPU to decode and encode on
+        mux_subtitles: Add subtitles as a mov_text track instead of burning them in
+            (stream copies the video when there is no overlay and no scaling needed)
+
+    Returns:
+        Tuple of (output path, elapsed seconds)
+    """
+    start_time = time.time()
+    logger.info(f"GPU single-pass processing: {video_path} with audio: {audio_path}")
+
+    audio_dur = get_media_duration(audio_path)
+
+    # GPU-ONLY quality presets
+    quality_settings = {
+        "ultra_fast": {
+            "gpu_preset": "p4",
+            "cq": "23",
+            "multipass": "disabled",
+            "spatial_aq": "0",
+            "temporal_aq": "0",
+            "audio_bitrate": "256k"
+        },
+        "high_quality": {
+            "gpu_preset": "p6",
+            "cq": "19",
+            "multipass": "fullres",
+            "spatial_aq": "1",
+            "temporal_aq": "1",
+            "audio_bitrate": "320k"
+        },
+        "maximum_quality": {
+            "gpu_preset": "p7",
+            "cq": "17",
+            "multipass": "fullres",
+            "spatial_aq": "1",
+            "temporal_aq": "1",
+            "audio_bitrate": "320k"
+        }
+    }
+
+    selected_quality = quality_settings.get(quality_preset, quality_settings["high_quality"])
+
+    if overlay_path:
+        settings = overlay_settings or {}
+        timing_mode = settings.get('timing_mode', 'custom_time')
+        overlay_start = settings.get('start_time', 0)
+        overlay_end = settings.get('end_time')
+
+        if timing_mode == "full_duration":
+            overlay_start = 0
+            overlay_end = audio_dur
+        elif timing_mode == "overlay_duration":
+            overlay_end = overlay_start + get_media_duration(overlay_path)
+        elif overlay_end is None:
+            overlay_end = audio_dur
+        overlay_end = min(overlay_end, audio_dur)
+
+        # Window is empty (story ends before the overlay starts, or end <= start): trim would
+        # reject a negative duration and treat 0 as unlimited, so leave the overlay out
+        if overlay_end <= overlay_start:
+            logger.warning(f"Overlay window {overlay_start}s-{overlay_end}s is empty, skipping overlay")
+            overlay_path = None
+
+    if not mux_subtitles:
+        # Background: scale on the GPU, then download once to burn subtitles (ass has no CUDA equivalent)
+        bg_filter = f"[0:v]scale_cuda=1920:1080:format=nv12,hwdownload,format=nv12,setsar=1,ass={str(subtitle_path)}"
+        if overlay_path:
+            # Back into VRAM for overlay_cuda
+            bg_filter += ",format=yuv420p,hwupload"
+        filters = [bg_filter + "[bg]"]
+    elif overlay_path:
+        # Background never leaves VRAM
+        filters = ["[0:v]scale_cuda=1920:1080:format=yuv420p[bg]"]
+    elif get_video_resolution(video_path) != (1920, 1080):
+        # Scale only; frames go straight from NVDEC to NVENC
+        filters = ["[0:v]scale_cuda=1920:1080:format=nv12[bg]"]
+    else:
+        # Nothing to render: loop the background by stream copy
+        filters = []
+    video_out = "[bg]"
+    audio_map = ["-map", "1:a"]
+
+    cmd = [
+        "ffmpeg", "-y",
+        *cuda_input_args(gpu_id),
+        "-stream_loop", "-1", "-i", str(video_path),
+        "-i", str(audio_path)
+    ]
+
+    if overlay_path:
+        size_percent = settings.get('size_percent', 20)
+
+        position_map = {
+            "top_left": ("10", "10"),
+            "top_right": ("main_w-overlay_w-10", "10"),
+            "bottom_left": ("10", "main_h-overlay_h-10"),
+            "bottom_right": ("main_w-overlay_w-10", "main_h-overlay_h-10"),
+            "center": ("(main_w-overlay_w)/2", "(main_h-overlay_h)/2")
+        }
+        overlay_x, overlay_y = position_map.get(settings.get('position', 'top_right'), ("10", "10"))
+
+        # overlay_cuda has no enable=, so trim the clip to the window and shift it to start there
+        scale = size_percent / 100
+        overlay_filter = (
+            f"[2:v]trim=duration={overlay_end - overlay_start},setpts=PTS-STARTPTS+{overlay_start}/TB,"
+            f"format=yuv420p,hwupload,scale_cuda=trunc(iw*{scale}/2)*2:trunc(ih*{scale}/2)*2"
+        )
+        if settings.get('remove_green', True):
+            overlay_filter += f",chromakey_cuda=color=0x00FF00:similarity={settings.get('green_similarity', 0.3)}:blend={settings.get('green_blend', 0.1)}"
+        filters.append(overlay_filter + "[ovr]")
+        filters.append(f"[bg][ovr]overlay_cuda=x={overlay_x}:y={overlay_y}:eof_action=pass[vout]")
+        video_out = "[vout]"
+
+        if settings.get('keep_overlay_audio', False):
+            filters.append(
+                f"[2:a]atrim=duration={overlay_end - overlay_start},asetpts=PTS-STARTPTS,"
+                f"adelay={int(overlay_start * 1000)}:all=1[oa]"
+            )
+            filters.append("[1:a][oa]amix=inputs=2:duration=first:dropout_transition=2[aout]")
+            audio_map = ["-map", "[aout]"]
+
+        cmd += ["-i", str(overlay_path)]
+
+    if mux_subtitles:
+        cmd += ["-i", str(subtitle_path)]
+        subtitle_map = ["-map", f"{3 if overlay_path else 2}:s"]
+    else:
+        subtitle_map = []
+
+    if filters:
+        cmd += ["-filter_complex", ";".join(filters), "-map", video_out]
+    else:
+        cmd += ["-map", "0:v"]
+    cmd += audio_map + subtitle_map
+
+    if not filters:
+        cmd += ["-c:v", "copy"]
+    else:
+        cmd += [
+            "-c:v", "h264_nvenc",
+            "-preset", selected_quality["gpu_preset"],
+            "-tune", "hq",
+            "-profile:v", "high",
+            "-rc", "vbr",
+            "-cq", selected_quality["cq"],
+            "-rc-lookahead", "32",
+            "-spatial-aq", selected_quality["spatial_aq"],
+            "-temporal-aq", selected_quality["temporal_aq"],
+            "-bf", "3",
+            "-gpu", str(gpu_id)
+        ]
+
+        # Add multipass if enabled
+        if selected_quality["multipass"] != "disabled":
+            cmd += ["-multipass", selected_quality["multipass"]]
+
+        # For maximum quality, enable additional features
+        if quality_preset == "maximum_quality":
+            cmd += ["-b_ref_mode", "middle", "-dpb_size", "4"]
+
+    if mux_subtitles:
+        cmd += ["-c:s", "mov_text", "-metadata:s:s:0", "language=eng"]
+
+    cmd += ["-c:a", "aac", "-b:a", selected_quality["audio_bitrate"], "-t", str(audio_dur), str(output_path)]
+
+    logger.info(f"GPU single-pass encode: {Path(output_path).name} ({audio_dur:.1f}s)")
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=3600)
+    if result.returncode != 0:
+        raise RuntimeError(f"GPU single-pass processing failed: {result.stderr.decode(errors='ignore')}")
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Successfully created final video with GPU in {format_time(elapsed_time)}: {output_path}")
+    return str(output_path), elapsed_time
+
 def process_single_video_task(task_data):
     """
     Process a single video task with GPU and timing - helper for parallel processing
@@ -322,6 +644,7 @@ def process_single_video_task(task_data):
             - audio_path: Path to audio file
             - output_path: Path for output file
             - quality_preset: Quality preset string
+            - gpu_id: GPU index to run on (default 0)
     
     Returns:
         Dictionary with task results, status, and timing info
@@ -333,6 +656,7 @@ def process_single_video_task(task_data):
         audio_path = task_data['audio_path']
         output_path = task_data['output_path']
         quality_preset = task_data.get('quality_preset', 'high_quality')
+        gpu_id = task_data.get('gpu_id', 0)
         
         logger.info(f"Starting GPU task: {Path(video_path).name} -> {Path(output_path).name}")
         
@@ -340,7 +664,8 @@ def process_single_video_task(task_data):
             video_path=video_path,
             audio_path=audio_path,
             output_path=output_path,
-            quality_preset=quality_preset
+            quality_preset=quality_preset,
+            gpu_id=gpu_id
         )
         
         elapsed_time = time.time() - start_time
@@ -390,11 +715,13 @@ def process_videos_parallel(tasks, max_workers=4, quality_preset="high_quality")
     max_workers = min(max_workers, 6)
     logger.info(f"Using GPU with {max_workers} parallel workers")
     
-    # Prepare tasks with settings
+    # Prepare tasks with settings, spreading them round-robin across GPUs
+    num_gpus = get_gpu_count()
     prepared_tasks = []
-    for task in tasks:
+    for i, task in enumerate(tasks):
         task_copy = task.copy()
         task_copy['quality_preset'] = quality_preset
+        task_copy.setdefault('gpu_id', i % num_gpus)
         prepared_tasks.append(task_copy)
     
     results = []
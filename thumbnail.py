@@ -1,22 +1,79 @@
 import streamlit as st
-from PIL import Image, ImageDraw, ImageFont
+import pandas as pd
+from PIL import Image, ImageDraw, ImageFont, ImageOps
 import json
 import random
+import numpy as np
 import io
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Probability of each text color per word, keyed by number of colors in use
+COLOR_WEIGHTS = {
+    1: [1.0, 0.0, 0.0],
+    2: [0.65, 0.35, 0.0],
+    3: [0.60, 0.25, 0.15],
+}
+
+def load_json(path):
+    """Load a JSON file, using orjson when available"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_json(path, data):
+    """Save data as indented JSON, using orjson when available"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+@lru_cache(maxsize=256)
+def load_truetype_font(font_path, size):
+    """Load a TrueType font once per (path, size) and reuse it across stories and size searches"""
+    return ImageFont.truetype(font_path, size)
 
 class ThumbnailGenerator:
     def __init__(self):
         pass
 
+    def _read_story_json(self, story_folder):
+        """Read metadata.json and source_info.json for one story folder"""
+        try:
+            metadata = load_json(story_folder / "metadata.json")
+        except:
+            return None
+
+        source_info = {}
+        source_file = story_folder / "source_info.json"
+        if source_file.exists():
+            try:
+                source_info = load_json(source_file)
+            except:
+                pass
+
+        return metadata, source_info
+
     def scan_rewritten_folders(self, project_path):
         """Scan project for all rewritten stories"""
         stories_data = []
         project_path = Path(project_path)
+        story_entries = []
 
         # Scan all channel folders
         for channel_dir in sorted(project_path.iterdir()):
-            if not channel_dir.is_dir() or channel_dir.name in ['__pycache__', '.git']:
+            if channel_dir.name in ['__pycache__', '.git'] or not channel_dir.is_dir():
                 continue
 
             rewritten_dir = channel_dir / "Rewritten"
@@ -24,40 +81,36 @@ class ThumbnailGenerator:
                 continue
 
             # Scan story folders
-            for story_folder in sorted(rewritten_dir.iterdir(), key=lambda x: int(x.name) if x.name.isdigit() else 999999):
-                if not story_folder.is_dir() or not story_folder.name.isdigit():
+            story_folders = [(int(p.name), p) for p in rewritten_dir.iterdir() if p.name.isdigit()]
+            story_folders.sort(key=itemgetter(0))
+            for _, story_folder in story_folders:
+                if not story_folder.is_dir():
                     continue
 
-                metadata_file = story_folder / "metadata.json"
-                if not metadata_file.exists():
+                if not (story_folder / "metadata.json").exists():
                     continue
 
-                try:
-                    with open(metadata_file, 'r', encoding='utf-8') as f:
-                        metadata = json.load(f)
-                except:
-                    continue
+                story_entries.append((channel_dir, story_folder))
 
-                thumbnail_file = story_folder / "thumbnail.png"
-                has_thumbnail = thumbnail_file.exists()
+        # Read all JSON files concurrently so per-file latency overlaps (slow disks / network shares)
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            loaded = list(executor.map(self._read_story_json, [folder for _, folder in story_entries]))
 
-                source_file = story_folder / "source_info.json"
-                source_info = {}
-                if source_file.exists():
-                    try:
-                        with open(source_file, 'r', encoding='utf-8') as f:
-                            source_info = json.load(f)
-                    except:
-                        pass
-
-                stories_data.append({
-                    'channel_name': channel_dir.name,
-                    'story_number': story_folder.name,
-                    'story_folder': story_folder,
-                    'metadata': metadata,
-                    'has_thumbnail': has_thumbnail,
-                    'source_info': source_info
-                })
+        for (channel_dir, story_folder), result in zip(story_entries, loaded):
+            if result is None:
+                continue
+            metadata, source_info = result
+
+            has_thumbnail = (story_folder / "thumbnail.jpg").exists() or (story_folder / "thumbnail.png").exists()
+
+            stories_data.append({
+                'channel_name': channel_dir.name,
+                'story_number': story_folder.name,
+                'story_folder': story_folder,
+                'metadata': metadata,
+                'has_thumbnail': has_thumbnail,
+                'source_info': source_info
+            })
 
         return stories_data
 
@@ -69,10 +122,10 @@ class ThumbnailGenerator:
         while font_size >= min_font_size:
             font_suffix = "-Bold" if bold else ""
             try:
-                test_font = ImageFont.truetype(f"/usr/share/fonts/truetype/dejavu/DejaVu{font_family}{font_suffix}.ttf", font_size)
+                test_font = load_truetype_font(f"/usr/share/fonts/truetype/dejavu/DejaVu{font_family}{font_suffix}.ttf", font_size)
             except:
                 try:
-                    test_font = ImageFont.truetype("arial.ttf", font_size)
+                    test_font = load_truetype_font("arial.ttf", font_size)
                 except:
                     test_font = ImageFont.load_default()
                     break
@@ -108,26 +161,13 @@ class ThumbnailGenerator:
 
     def assign_word_colors(self, words, num_colors, color1, color2, color3):
         """Assign colors to words based on weighted random distribution"""
-        color_assignments = []
-
-        for word in words:
-            if num_colors == 1:
-                color_assignments.append(color1)
-            elif num_colors == 2:
-                if random.random() < 0.65:
-                    color_assignments.append(color1)
-                else:
-                    color_assignments.append(color2)
-            else:
-                rand = random.random()
-                if rand < 0.60:
-                    color_assignments.append(color1)
-                elif rand < 0.85:
-                    color_assignments.append(color2)
-                else:
-                    color_assignments.append(color3)
+        if not words:
+            return []
+
+        probabilities = COLOR_WEIGHTS.get(num_colors, COLOR_WEIGHTS[3])
+        colors = np.array([color1, color2, color3], dtype=object)
 
-        return color_assignments
+        return np.random.choice(colors, size=len(words), p=probabilities).tolist()
 
     def wrap_text_with_colors(self, text, font, max_width, color_assignments):
         """Wrap text and maintain color assignments"""
@@ -157,33 +197,14 @@ class ThumbnailGenerator:
 
     def resize_headshot_maintain_aspect(self, headshot_image, target_width, target_height):
         """Resize headshot maintaining aspect ratio and crop to fit"""
-        # Get original dimensions
-        orig_width, orig_height = headshot_image.size
-        orig_aspect = orig_width / orig_height
-        target_aspect = target_width / target_height
-
-        # Calculate new dimensions to fill target area
-        if orig_aspect > target_aspect:
-            # Image is wider - fit to height and crop width
-            new_height = target_height
-            new_width = int(orig_aspect * new_height)
-        else:
-            # Image is taller - fit to width and crop height
-            new_width = target_width
-            new_height = int(new_width / orig_aspect)
-
-        # Resize image
-        resized = headshot_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # Crop to target size (center crop)
-        left = (new_width - target_width) // 2
-        top = (new_height - target_height) // 2
-        right = left + target_width
-        bottom = top + target_height
+        if headshot_image.size == (target_width, target_height):
+            return headshot_image
 
-        cropped = resized.crop((left, top, right, bottom))
-
-        return cropped
+        # Single LANCZOS pass straight to the target size with a center crop
+        return ImageOps.fit(
+            headshot_image, (target_width, target_height),
+            method=Image.Resampling.LANCZOS, centering=(0.5, 0.5)
+        )
 
     def generate_thumbnail(self, story_text, bottom_text, bg_color, text_font_size, text_font_family,
                           text_bold, num_text_colors, text_color1, text_color2, text_color3,
@@ -193,11 +214,14 @@ class ThumbnailGenerator:
         """Generate thumbnail with all settings including custom headshot positioning"""
 
         width, height = 1280, 720
-        img = Image.new('RGB', (width, height), bg_color)
-
         if background_image:
-            bg = background_image.resize((width, height))
-            img.paste(bg, (0, 0))
+            # Callers pass a background already resized to the canvas so each story is just a copy
+            if background_image.size == (width, height) and background_image.mode == 'RGB':
+                img = background_image.copy()
+            else:
+                img = background_image.resize((width, height), Image.Resampling.LANCZOS).convert('RGB')
+        else:
+            img = Image.new('RGB', (width, height), bg_color)
 
         draw = ImageDraw.Draw(img)
 
@@ -230,24 +254,16 @@ class ThumbnailGenerator:
         color_assignments = self.assign_word_colors(words, num_text_colors, text_color1, text_color2, text_color3)
 
         font_suffix = "-Bold" if text_bold else ""
-        try:
-            font = ImageFont.truetype(f"/usr/share/fonts/truetype/dejavu/DejaVu{text_font_family}{font_suffix}.ttf", text_font_size)
-        except:
-            try:
-                font = ImageFont.truetype("arial.ttf", text_font_size)
-            except:
-                font = ImageFont.load_default()
-
         text_area_height = 500
         optimal_font_size = self.calculate_optimal_font_size(
             story_text, text_font_family, text_bold, text_area_width, text_area_height, text_font_size
         )
 
         try:
-            font = ImageFont.truetype(f"/usr/share/fonts/truetype/dejavu/DejaVu{text_font_family}{font_suffix}.ttf", optimal_font_size)
+            font = load_truetype_font(f"/usr/share/fonts/truetype/dejavu/DejaVu{text_font_family}{font_suffix}.ttf", optimal_font_size)
         except:
             try:
-                font = ImageFont.truetype("arial.ttf", optimal_font_size)
+                font = load_truetype_font("arial.ttf", optimal_font_size)
             except:
                 font = ImageFont.load_default()
 
@@ -257,20 +273,31 @@ class ThumbnailGenerator:
         total_text_height = len(lines) * line_height
         text_start_y = 80 + (text_area_height - total_text_height) // 2
 
-        y_offset = text_start_y
-        for line_words, line_colors in lines:
-            line_text = ' '.join(line_words)
-            bbox = font.getbbox(line_text)
-            line_width = bbox[2] - bbox[0]
-            x_offset = text_area_x + (text_area_width - line_width) // 2
-
-            for word, color in zip(line_words, line_colors):
-                draw.text((x_offset, y_offset), word, font=font, fill=color)
-                word_bbox = font.getbbox(word)
-                word_width = word_bbox[2] - word_bbox[0]
-                x_offset += word_width + font.getbbox(' ')[2]
-
-            y_offset += line_height
+        if num_text_colors == 1 and lines:
+            # Single color: draw the whole block in one layout pass
+            line_texts = [' '.join(line_words) for line_words, _ in lines]
+            block_width = max(font.getbbox(t)[2] - font.getbbox(t)[0] for t in line_texts)
+            block_x = text_area_x + (text_area_width - block_width) // 2
+            # multiline_text advances by the height of "A" plus spacing; keep the same line pitch as below
+            spacing = line_height - draw.textbbox((0, 0), "A", font=font)[3]
+            draw.multiline_text((block_x, text_start_y), "\n".join(line_texts), font=font,
+                                fill=text_color1, align='center', spacing=spacing)
+        else:
+            y_offset = text_start_y
+            space_width = font.getbbox(' ')[2]
+            for line_words, line_colors in lines:
+                line_text = ' '.join(line_words)
+                bbox = font.getbbox(line_text)
+                line_width = bbox[2] - bbox[0]
+                x_offset = text_area_x + (text_area_width - line_width) // 2
+
+                for word, color in zip(line_words, line_colors):
+                    draw.text((x_offset, y_offset), word, font=font, fill=color)
+                    word_bbox = font.getbbox(word)
+                    word_width = word_bbox[2] - word_bbox[0]
+                    x_offset += word_width + space_width
+
+                y_offset += line_height
 
         # Bottom bar
         bar_height = 100
@@ -279,10 +306,10 @@ class ThumbnailGenerator:
 
         bar_font_suffix = "-Bold" if bottom_bar_bold else ""
         try:
-            bar_font = ImageFont.truetype(f"/usr/share/fonts/truetype/dejavu/DejaVuSans{bar_font_suffix}.ttf", bottom_bar_font_size)
+            bar_font = load_truetype_font(f"/usr/share/fonts/truetype/dejavu/DejaVuSans{bar_font_suffix}.ttf", bottom_bar_font_size)
         except:
             try:
-                bar_font = ImageFont.truetype("arial.ttf", bottom_bar_font_size)
+                bar_font = load_truetype_font("arial.ttf", bottom_bar_font_size)
             except:
                 bar_font = ImageFont.load_default()
 
@@ -297,6 +324,28 @@ class ThumbnailGenerator:
         return img
 
 
+@st.cache_data(show_spinner=False)
+def prepare_headshot(file_bytes, target_width, target_height):
+    """Decode, resize and crop an uploaded headshot once; cached across reruns as PNG bytes"""
+    headshot = Image.open(io.BytesIO(file_bytes))
+    fitted = ThumbnailGenerator().resize_headshot_maintain_aspect(headshot, target_width, target_height)
+    # PNG can't hold every mode (CMYK JPEGs raise OSError); keep alpha only when there is one
+    has_alpha = 'A' in fitted.getbands() or 'transparency' in fitted.info
+    fitted = fitted.convert('RGBA' if has_alpha else 'RGB')
+    buffer = io.BytesIO()
+    fitted.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@st.cache_data(show_spinner=False)
+def prepare_background(file_bytes):
+    """Decode and resize an uploaded background to the 1280x720 canvas once; cached as PNG bytes"""
+    background = Image.open(io.BytesIO(file_bytes)).resize((1280, 720), Image.Resampling.LANCZOS).convert('RGB')
+    buffer = io.BytesIO()
+    background.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
 class ThumbnailGeneratorApp:
     def __init__(self):
         self.generator = ThumbnailGenerator()
@@ -314,11 +363,14 @@ class ThumbnailGeneratorApp:
             st.session_state.tg_selected_stories = []
         if 'tg_preview_image' not in st.session_state:
             st.session_state.tg_preview_image = None
+        if 'tg_editor_version' not in st.session_state:
+            st.session_state.tg_editor_version = 0
 
         # Scan button
         if st.button("🔍 Scan Rewritten Folders to Create Thumbnails", width='stretch', key="tg_scan_btn"):
             st.session_state.tg_scanned_stories = self.generator.scan_rewritten_folders(st.session_state.current_project_path)
             st.session_state.tg_selected_stories = []
+            st.session_state.tg_editor_version += 1
             st.rerun()
 
         if not st.session_state.tg_scanned_stories:
@@ -326,41 +378,40 @@ class ThumbnailGeneratorApp:
 
         st.success(f"📋 Found {len(st.session_state.tg_scanned_stories)} stories")
 
-        # Group by channel
-        channels = {}
-        for story in st.session_state.tg_scanned_stories:
-            ch_name = story['channel_name']
-            if ch_name not in channels:
-                channels[ch_name] = []
-            channels[ch_name].append(story)
-
         # Select All / Deselect All
         col1, col2 = st.columns(2)
         with col1:
             if st.button("☑️ Select All", width='stretch', key="tg_select_all"):
                 st.session_state.tg_selected_stories = list(range(len(st.session_state.tg_scanned_stories)))
+                st.session_state.tg_editor_version += 1
                 st.rerun()
         with col2:
             if st.button("☐ Deselect All", width='stretch', key="tg_deselect_all"):
                 st.session_state.tg_selected_stories = []
+                st.session_state.tg_editor_version += 1
                 st.rerun()
 
-        # Story selection
+        # Story selection - one data editor instead of a checkbox widget per story
         st.markdown("### 📚 Stories")
-        for ch_name, ch_stories in sorted(channels.items()):
-            st.markdown(f"**📁 {ch_name}**")
-
-            for story in ch_stories:
-                idx = st.session_state.tg_scanned_stories.index(story)
-                status = "✅" if story['has_thumbnail'] else "⏳"
-                label = f"{status} Story {story['story_number']}: {story['metadata'].get('thumbnail', '')[:50]}..."
-
-                if st.checkbox(label, value=(idx in st.session_state.tg_selected_stories), key=f"tg_story_{idx}"):
-                    if idx not in st.session_state.tg_selected_stories:
-                        st.session_state.tg_selected_stories.append(idx)
-                else:
-                    if idx in st.session_state.tg_selected_stories:
-                        st.session_state.tg_selected_stories.remove(idx)
+        selected = set(st.session_state.tg_selected_stories)
+        stories_df = pd.DataFrame({
+            'Select': [idx in selected for idx in range(len(st.session_state.tg_scanned_stories))],
+            'Channel': [s['channel_name'] for s in st.session_state.tg_scanned_stories],
+            'Story': [s['story_number'] for s in st.session_state.tg_scanned_stories],
+            'Title': [s['metadata'].get('thumbnail', '')[:50] for s in st.session_state.tg_scanned_stories],
+            'Status': ["✅" if s['has_thumbnail'] else "⏳" for s in st.session_state.tg_scanned_stories],
+        })
+
+        edited_df = st.data_editor(
+            stories_df,
+            column_config={'Select': st.column_config.CheckboxColumn()},
+            disabled=['Channel', 'Story', 'Title', 'Status'],
+            hide_index=True,
+            num_rows='fixed',
+            width='stretch',
+            key=f"tg_story_editor_{st.session_state.tg_editor_version}"
+        )
+        st.session_state.tg_selected_stories = edited_df.index[edited_df['Select']].tolist()
 
         if not st.session_state.tg_selected_stories:
             st.warning("⚠️ Please select at least one story")
@@ -376,7 +427,6 @@ class ThumbnailGeneratorApp:
         col1, col2 = st.columns(2)
         with col1:
             bg_file = st.file_uploader("Background Image (optional)", type=['png', 'jpg', 'jpeg'], key="tg_bg")
-            bg_image = Image.open(bg_file) if bg_file else None
         with col2:
             bg_color = st.color_picker("Background Color", "#1a1a1a", key="tg_bg_color")
 
@@ -478,7 +528,10 @@ class ThumbnailGeneratorApp:
 
             if uploaded_files:
                 st.success(f"✅ Uploaded {len(uploaded_files)} headshots")
-                headshot_images = [Image.open(f) for f in uploaded_files]
+                headshot_images = [
+                    Image.open(io.BytesIO(prepare_headshot(f.getvalue(), headshot_width, headshot_height)))
+                    for f in uploaded_files
+                ]
                 position = st.selectbox("Base Headshot Position:", ["Right", "Left"], key="tg_random_pos")
 
                 for idx in st.session_state.tg_selected_stories:
@@ -506,7 +559,7 @@ class ThumbnailGeneratorApp:
 
                     if headshot_file:
                         headshots_data[idx] = {
-                            'image': Image.open(headshot_file),
+                            'image': Image.open(io.BytesIO(prepare_headshot(headshot_file.getvalue(), headshot_width, headshot_height))),
                             'position': position
                         }
 
@@ -530,6 +583,8 @@ class ThumbnailGeneratorApp:
                     st.error("⚠️ First story missing headshot")
                 else:
                     with st.spinner("Generating..."):
+                        # Resized once per upload (cached); generate_thumbnail only copies it
+                        bg_image = Image.open(io.BytesIO(prepare_background(bg_file.getvalue()))).convert('RGB') if bg_file else None
                         thumbnail_text = story['metadata'].get('thumbnail', 'No text')
                         hook_text = story['metadata'].get('hook', '¡MIRA LO QUE PASÓ!')
 
@@ -583,6 +638,9 @@ class ThumbnailGeneratorApp:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
+                # Resized once per upload (cached); generate_thumbnail only copies it per story
+                bg_image = Image.open(io.BytesIO(prepare_background(bg_file.getvalue()))).convert('RGB') if bg_file else None
+
                 success_count = 0
 
                 for i, idx in enumerate(stories_to_process):
@@ -617,8 +675,11 @@ class ThumbnailGeneratorApp:
                             headshot_height=headshot_height
                         )
 
-                        output_path = story['story_folder'] / "thumbnail.png"
-                        thumbnail.save(output_path)
+                        # Opaque photographic output - JPEG is far smaller and faster to encode than PNG
+                        output_path = story['story_folder'] / "thumbnail.jpg"
+                        thumbnail.save(output_path, 'JPEG', quality=92, optimize=True, progressive=True, subsampling=1)
+                        # Drop a PNG left by earlier runs so the story has a single thumbnail
+                        (story['story_folder'] / "thumbnail.png").unlink(missing_ok=True)
 
                         settings = {
                             'bg_color': bg_color,
@@ -641,8 +702,7 @@ class ThumbnailGeneratorApp:
                         }
 
                         settings_path = story['story_folder'] / "thumbnail_settings.json"
-                        with open(settings_path, 'w', encoding='utf-8') as f:
-                            json.dump(settings, f, indent=2)
+                        save_json(settings_path, settings)
 
                         success_count += 1
 
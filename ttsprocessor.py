@@ -1,88 +1,416 @@
 import streamlit as st
+import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 import json
 import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import queue
+import threading
+from operator import itemgetter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+VOICES_FILE = "voices.json"
+
+# Texts longer than this are split on sentence boundaries and synthesized in parallel
+MAX_CHUNK_CHARS = 3500
+CHUNK_WORKERS = 4
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…])\s+')
+
+# Attempts per request; transient failures back off 1s, 2s, ... (plus jitter)
+TTS_MAX_ATTEMPTS = 3
+
+TTS_HEADERS = {
+    "Content-Type": "application/json"
+}
+
+# Scan results persisted in the project folder between app restarts
+SCAN_CACHE_FILE = ".tts_scan_cache.json"
+SCAN_CACHE_VERSION = 3
+
+# project_path -> (scan signature, stories_data); survives Streamlit reruns within the server process
+_scan_cache = {}
+
+def load_json(path):
+    """Load a JSON file, using orjson on the raw bytes when available"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def dump_json_bytes(data):
+    """Serialize to compact JSON bytes, using orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
 
 class TTSProcessor:
     def __init__(self, tts_endpoint):
         self.tts_endpoint = tts_endpoint
+        
+        # One keep-alive session shared by all worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # voice -> encoded static part of the request body
+        self._payload_prefixes = {}
+        
+        # metadata.json path -> (mtime_ns, parsed metadata)
+        self._meta_cache = {}
+        # Unparseable metadata.json path -> mtime_ns when it failed; skipped until the file changes
+        self._bad_meta = {}
+        self.bad_meta_files = []
+    
+    def _load_meta(self, metadata_path):
+        """Parse a metadata.json, reusing the cached result while its mtime is unchanged"""
+        mtime = os.stat(metadata_path).st_mtime_ns
+        cached = self._meta_cache.get(metadata_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        if self._bad_meta.get(metadata_path) == mtime:
+            return {}
+        
+        try:
+            metadata = load_json(metadata_path)
+        except (ValueError, OSError):
+            # json/orjson decode errors are ValueErrors
+            self._bad_meta[metadata_path] = mtime
+            self.bad_meta_files.append(metadata_path)
+            return {}
+        self._meta_cache[metadata_path] = (mtime, metadata)
+        return metadata
+    
+    def _scan_signature(self, project_path):
+        """mtimes of every Rewritten folder and the story folders inside it"""
+        # The root's own mtime is left out: saving the scan cache file into it changes it
+        with os.scandir(project_path) as it:
+            channel_entries = sorted(
+                (e for e in it if e.name not in ['__pycache__', '.git'] and e.is_dir()),
+                key=lambda e: e.name
+            )
+        
+        if not channel_entries:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(16, len(channel_entries))) as executor:
+            return [sig for sig in executor.map(self._channel_signature, channel_entries) if sig]
+    
+    def _channel_signature(self, channel_entry):
+        """Signature of one channel's Rewritten tree, or None if it has none"""
+        rewritten_path = os.path.join(channel_entry.path, "Rewritten")
+        try:
+            rewritten_mtime = os.stat(rewritten_path).st_mtime_ns
+            # One directory read per channel. A story folder's mtime changes when a file in it is
+            # created, deleted or renamed (MP3s are swapped in by rename); the rewrite step
+            # touches the folder after overwriting a story
+            with os.scandir(rewritten_path) as it:
+                stories = [
+                    [e.name, e.stat().st_mtime_ns]
+                    for e in it if e.name.isdigit() and e.is_dir()
+                ]
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        stories.sort()
+        
+        return [channel_entry.name, rewritten_mtime, stories]
+    
+    def _load_disk_cache(self, project_path, signature):
+        """Stories from the project's scan cache file, or None if missing or stale"""
+        try:
+            cached = load_json(os.path.join(project_path, SCAN_CACHE_FILE))
+        except (ValueError, OSError):
+            return None
+        if cached.get('version') != SCAN_CACHE_VERSION or cached.get('signature') != signature:
+            return None
+        return cached.get('stories')
+    
+    def _save_disk_cache(self, project_path, signature, stories_data):
+        """Write the scan cache atomically; it only holds strings, bools and ints"""
+        cache_path = os.path.join(project_path, SCAN_CACHE_FILE)
+        fd, tmp_path = tempfile.mkstemp(dir=project_path, prefix=f"{SCAN_CACHE_FILE}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(dump_json_bytes({
+                    'version': SCAN_CACHE_VERSION,
+                    'signature': signature,
+                    'stories': stories_data
+                }))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    
+    def clear_cache(self, project_path=None):
+        """Drop cached scan results so the next scan walks the filesystem again"""
+        _scan_cache.clear()
+        if project_path:
+            try:
+                os.remove(os.path.join(project_path, SCAN_CACHE_FILE))
+            except OSError:
+                pass
     
     def scan_rewritten_folders(self, project_path):
+        """Scan project for all rewritten stories, reusing the last result while the tree is unchanged"""
+        cache_key = str(project_path)
+        signature = self._scan_signature(project_path)
+        cached = _scan_cache.get(cache_key)
+        if cached and cached[0] == signature:
+            return list(cached[1])
+        
+        # A fresh server process can still skip the walk using the on-disk cache
+        stories_data = self._load_disk_cache(project_path, signature)
+        if stories_data is None:
+            stories_data = self._scan_rewritten_folders_uncached(project_path)
+            self._save_disk_cache(project_path, signature, stories_data)
+        
+        _scan_cache[cache_key] = (signature, stories_data)
+        return list(stories_data)
+    
+    def _scan_rewritten_folders_uncached(self, project_path):
         """Scan project for all rewritten stories"""
+        # Scan all channel folders (DirEntry caches the type, so no extra stat per entry)
+        with os.scandir(project_path) as it:
+            channel_entries = sorted(
+                (e for e in it if e.name not in ['__pycache__', '.git'] and e.is_dir()),
+                key=lambda e: e.name
+            )
+        
+        if not channel_entries:
+            return []
+        
+        # Channels are independent subtrees; scandir/stat release the GIL
+        with ThreadPoolExecutor(max_workers=min(16, len(channel_entries))) as executor:
+            channel_results = list(executor.map(self._scan_one_channel, channel_entries))
+        
+        return [story for channel_stories in channel_results for story in channel_stories]
+    
+    def _scan_one_channel(self, channel_entry):
+        """Scan one channel's Rewritten folder"""
         stories_data = []
-        project_path = Path(project_path)
         
-        # Scan all channel folders
-        for channel_dir in sorted(project_path.iterdir()):
-            if not channel_dir.is_dir() or channel_dir.name in ['__pycache__', '.git']:
-                continue
+        try:
+            with os.scandir(os.path.join(channel_entry.path, "Rewritten")) as it:
+                # Integer sort keys are computed once, in the same pass as the filter
+                story_entries = [(int(e.name), e) for e in it if e.name.isdigit() and e.is_dir()]
+        except (FileNotFoundError, NotADirectoryError):
+            return stories_data
+        story_entries.sort(key=itemgetter(0))
+        
+        # Scan story folders
+        for _, story_entry in story_entries:
+            # One directory read tells us which story files exist
+            with os.scandir(story_entry.path) as it:
+                file_names = {e.name for e in it}
             
-            rewritten_dir = channel_dir / "Rewritten"
-            if not rewritten_dir.exists():
+            story_name = f"Story_{story_entry.name}"
+            if f"{story_name}.txt" not in file_names:
                 continue
             
-            # Scan story folders
-            for story_folder in sorted(rewritten_dir.iterdir(), key=lambda x: int(x.name) if x.name.isdigit() else 999999):
-                if not story_folder.is_dir() or not story_folder.name.isdigit():
-                    continue
-                
-                story_file = story_folder / f"Story_{story_folder.name}.txt"
-                if not story_file.exists():
-                    continue
-                
-                # Check if MP3 already exists
-                mp3_file = story_folder / f"Story_{story_folder.name}.mp3"
-                has_audio = mp3_file.exists()
-                
-                # Load metadata
-                metadata_file = story_folder / "metadata.json"
-                metadata = {}
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                    except:
-                        pass
-                
-                stories_data.append({
-                    'channel_name': channel_dir.name,
-                    'story_number': story_folder.name,
-                    'story_file': story_file,
-                    'story_folder': story_folder,
-                    'has_audio': has_audio,
-                    'title': metadata.get('title', f'Story {story_folder.name}')
-                })
+            # Plain string paths - no Path objects built per story
+            story_folder = story_entry.path
+            
+            # Check if MP3 already exists
+            has_audio = f"{story_name}.mp3" in file_names
+            
+            # Load metadata
+            metadata = {}
+            if "metadata.json" in file_names:
+                try:
+                    metadata = self._load_meta(f"{story_folder}{os.sep}metadata.json")
+                except OSError:
+                    pass
+            
+            stories_data.append({
+                'channel_name': channel_entry.name,
+                'story_number': story_entry.name,
+                'story_file': f"{story_folder}{os.sep}{story_name}.txt",
+                'story_folder': story_folder,
+                'mp3_path': f"{story_folder}{os.sep}{story_name}.mp3",
+                'has_audio': has_audio,
+                'title': metadata.get('title', f'Story {story_entry.name}')
+            })
         
         return stories_data
     
-    def generate_audio(self, text, output_path, voice="af_sky"):
-        """Generate audio using Kokoro TTS - SAME LOGIC AS BEFORE"""
+    def _chunk_text(self, text, max_chars=MAX_CHUNK_CHARS):
+        """Split text into chunks of at most max_chars, breaking on paragraphs and sentences"""
+        if len(text) <= max_chars:
+            return [text]
+        
+        pieces = []
+        for paragraph in text.split("\n"):
+            for sentence in SENTENCE_SPLIT_RE.split(paragraph.strip()):
+                # A single overlong sentence is broken on whitespace
+                while len(sentence) > max_chars:
+                    cut = sentence.rfind(" ", 0, max_chars)
+                    cut = cut if cut > 0 else max_chars
+                    pieces.append(sentence[:cut])
+                    sentence = sentence[cut:].lstrip()
+                if sentence:
+                    pieces.append(sentence)
+        
+        chunks = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append(current)
+        
+        return chunks
+    
+    def _payload_prefix(self, voice):
+        """Pre-encoded request body up to (not including) the closing brace; only "input" varies per call"""
+        prefix = self._payload_prefixes.get(voice)
+        if prefix is None:
+            prefix = dump_json_bytes({
+                "model": "kokoro",
+                "voice": voice,
+                "response_format": "mp3",
+                "speed": 1.0
+            })[:-1]
+            self._payload_prefixes[voice] = prefix
+        return prefix
+    
+    def _request_audio(self, text, output_path, voice):
+        """POST one text to the TTS endpoint and stream the MP3 to output_path"""
+        # The OpenAI-compatible /v1/audio/speech endpoint takes a single string "input" and
+        # returns one audio stream, so stories can't be batched into one call; per-request
+        # overhead is amortized by the keep-alive session and concurrent requests instead.
         url = self.tts_endpoint
+        body = self._payload_prefix(voice) + b',"input":' + dump_json_bytes(text) + b'}'
         
-        payload = {
-            "model": "kokoro",
-            "input": text,
-            "voice": voice,
-            "response_format": "mp3",
-            "speed": 1.0
-        }
+        # Stream into a .part file and swap it in, so a failed request never leaves a truncated MP3
+        part_path = f"{output_path}.part"
         
-        headers = {
-            "Content-Type": "application/json"
-        }
+        last_error = None
+        for attempt in range(TTS_MAX_ATTEMPTS):
+            try:
+                with self.session.post(url, data=body, headers=TTS_HEADERS, timeout=300, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    
+                    with open(part_path, 'wb', buffering=1 << 20) as f:
+                        shutil.copyfileobj(response.raw, f, length=262144)
+                
+                os.replace(part_path, output_path)
+                return True
+                
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError, ProtocolError, ReadTimeoutError) as e:
+                last_error = e
+                # 4xx won't succeed on retry; dropped connections, timeouts and 5xx might.
+                # Reading response.raw directly surfaces urllib3's own errors, not requests' wrappers
+                status_code = getattr(getattr(e, 'response', None), 'status_code', None)
+                if status_code is not None and status_code < 500:
+                    break
+                if attempt < TTS_MAX_ATTEMPTS - 1:
+                    time.sleep(2 ** attempt + random.random())
+            
+            except Exception as e:
+                last_error = e
+                break
+        
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        raise Exception(f"TTS generation failed: {str(last_error)}")
+    
+    def _concat_mp3(self, chunk_paths, output_path):
+        """Join chunk MP3s; ffmpeg rewrites the headers so the duration is correct"""
+        part_path = f"{output_path}.part"
+        list_path = f"{output_path}.concat.txt"
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=300)
-            response.raise_for_status()
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for chunk_path in chunk_paths:
+                    # Concat list quoting: a ' inside a quoted path is written as '\''
+                    quoted = str(Path(chunk_path).resolve()).replace("'", "'\\''")
+                    f.write(f"file '{quoted}'\n")
             
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
+            cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", "-f", "mp3", part_path]
+            try:
+                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False, timeout=600)
+                concat_ok = result.returncode == 0
+            except FileNotFoundError:
+                concat_ok = False
             
-            return True
+            if not concat_ok:
+                # No ffmpeg or it failed: MP3 frames are self-contained, so plain concatenation still plays
+                with open(part_path, 'wb', buffering=1 << 20) as out:
+                    for chunk_path in chunk_paths:
+                        with open(chunk_path, 'rb') as f:
+                            shutil.copyfileobj(f, out, length=262144)
+            
+            os.replace(part_path, output_path)
+        finally:
+            for path in (list_path, part_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    
+    def generate_audio(self, text, output_path, voice="af_sky"):
+        """Generate audio using Kokoro TTS; long texts are synthesized as parallel chunks and joined"""
+        chunks = self._chunk_text(text)
+        if len(chunks) == 1:
+            return self._request_audio(text, output_path, voice)
+        
+        chunk_paths = [f"{output_path}.chunk{i}.mp3" for i in range(len(chunks))]
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(chunks), CHUNK_WORKERS)) as executor:
+                futures = [
+                    executor.submit(self._request_audio, chunk, chunk_path, voice)
+                    for chunk, chunk_path in zip(chunks, chunk_paths)
+                ]
+                for future in futures:
+                    future.result()
             
-        except Exception as e:
-            raise Exception(f"TTS generation failed: {str(e)}")
+            self._concat_mp3(chunk_paths, output_path)
+            return True
+        finally:
+            for chunk_path in chunk_paths:
+                try:
+                    os.remove(chunk_path)
+                except OSError:
+                    pass
+    
+    def read_story_texts(self, stories, text_queue):
+        """Producer: read story texts ahead of the TTS requests, then signal the end with None"""
+        for story in stories:
+            try:
+                with open(story['story_file'], 'r', encoding='utf-8') as f:
+                    text_queue.put((story, f.read(), None))
+            except Exception as e:
+                text_queue.put((story, None, e))
+        text_queue.put(None)
+
+
+@st.cache_data(show_spinner=False)
+def _load_voices(mtime):
+    """Parse voices.json; the mtime argument re-reads the file only when it changes"""
+    return load_json(VOICES_FILE).get('voices', [])
 
 
 class TTSProcessorApp:
@@ -94,14 +422,42 @@ class TTSProcessorApp:
             st.session_state.tts_selected_stories = set()
         if 'tts_is_processing' not in st.session_state:
             st.session_state.tts_is_processing = False
+        if 'tts_editor_version' not in st.session_state:
+            st.session_state.tts_editor_version = 0
+        if 'tts_df' not in st.session_state:
+            st.session_state.tts_df = self._stories_frame(st.session_state.tts_scanned_stories)
+    
+    def _get_processor(self):
+        """One TTSProcessor per session, so its connection pool and caches survive reruns"""
+        processor = st.session_state.get('tts_processor')
+        if processor is None or processor.tts_endpoint != st.session_state.tts_endpoint:
+            processor = TTSProcessor(st.session_state.tts_endpoint)
+            st.session_state.tts_processor = processor
+        return processor
+    
+    def _stories_frame(self, stories):
+        """Columnar view of the scanned stories for grouping and filtering"""
+        return pd.DataFrame({
+            'channel_name': [s['channel_name'] for s in stories],
+            'story_number': [s['story_number'] for s in stories],
+            'title': [s['title'] for s in stories],
+            'has_audio': np.array([s['has_audio'] for s in stories], dtype=bool),
+        })
+    
+    def _stories_to_process(self, skip_existing):
+        """Selected stories, minus those that already have audio when skipping"""
+        df = st.session_state.tts_df
+        mask = df.index.isin(list(st.session_state.tts_selected_stories))
+        if skip_existing:
+            mask &= ~df['has_audio'].to_numpy()
+        return [st.session_state.tts_scanned_stories[idx] for idx in df.index[mask]]
     
     def _load_voices_from_json(self):
-        voices_file_path = Path("voices.json")
-        if voices_file_path.exists():
-            with open(voices_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('voices', [])
-        return []
+        try:
+            mtime = os.stat(VOICES_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        return _load_voices(mtime)
 
     def run(self):
         # Check if project loaded
@@ -109,11 +465,23 @@ class TTSProcessorApp:
             st.warning("⚠️ Please create/load a project in Step 0 first")
             return
         
-        # Scan button
-        if st.button("🔍 Scan Rewritten Folders", width='stretch', key="tts_scan_btn"):
-            processor = TTSProcessor(st.session_state.tts_endpoint)
+        # Scan buttons
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            scan_clicked = st.button("🔍 Scan Rewritten Folders", width='stretch', key="tts_scan_btn")
+        with col2:
+            force_clicked = st.button("🔄 Force Rescan", width='stretch', key="tts_force_rescan_btn")
+        
+        if scan_clicked or force_clicked:
+            processor = self._get_processor()
+            if force_clicked:
+                processor.clear_cache(st.session_state.current_project_path)
+            processor.bad_meta_files = []
             st.session_state.tts_scanned_stories = processor.scan_rewritten_folders(st.session_state.current_project_path)
+            st.session_state.tts_scan_warnings = processor.bad_meta_files
+            st.session_state.tts_df = self._stories_frame(st.session_state.tts_scanned_stories)
             st.session_state.tts_selected_stories = set()
+            st.session_state.tts_editor_version += 1
             st.rerun()
         
         if not st.session_state.tts_scanned_stories:
@@ -121,61 +489,66 @@ class TTSProcessorApp:
         
         st.success(f"📋 Found {len(st.session_state.tts_scanned_stories)} stories")
         
+        for bad_file in st.session_state.get('tts_scan_warnings', []):
+            st.warning(f"⚠️ Could not parse {bad_file} - using default title")
+        
         # Group by channel
-        channels = {}
-        for story in st.session_state.tts_scanned_stories:
-            ch_name = story['channel_name']
-            if ch_name not in channels:
-                channels[ch_name] = []
-            channels[ch_name].append(story)
+        df = st.session_state.tts_df
+        channels = {name: group.index.tolist() for name, group in df.groupby('channel_name', sort=True)}
         
         # Select All / Deselect All (Global)
         col1, col2 = st.columns(2)
         with col1:
             if st.button("☑️ Select All", width='stretch', key="tts_select_all_global"):
                 st.session_state.tts_selected_stories = set(range(len(st.session_state.tts_scanned_stories)))
+                st.session_state.tts_editor_version += 1
                 st.rerun()
         with col2:
             if st.button("☐ Deselect All", width='stretch', key="tts_deselect_all_global"):
                 st.session_state.tts_selected_stories = set()
+                st.session_state.tts_editor_version += 1
                 st.rerun()
         
         st.markdown("---")
         
-        # Show stories grouped by channel
-        for ch_name, ch_stories in sorted(channels.items()):
-            st.markdown(f"### 📁 {ch_name} ({len(ch_stories)} stories)")
-            
-            # Select All / Deselect All for this channel
-            col1, col2 = st.columns(2)
-            
-            # Get indices for this channel
-            ch_indices = [i for i, s in enumerate(st.session_state.tts_scanned_stories) if s['channel_name'] == ch_name]
+        # Select All / Deselect All per channel
+        for ch_name, ch_indices in channels.items():
+            col1, col2, col3 = st.columns([2, 1, 1])
             
             with col1:
+                st.markdown(f"**📁 {ch_name}** ({len(ch_indices)} stories)")
+            with col2:
                 if st.button(f"☑️ Select All", key=f"tts_select_ch_{ch_name}", width='stretch'):
                     st.session_state.tts_selected_stories.update(ch_indices)
+                    st.session_state.tts_editor_version += 1
                     st.rerun()
-            with col2:
+            with col3:
                 if st.button(f"☐ Deselect All", key=f"tts_deselect_ch_{ch_name}", width='stretch'):
-                    for idx in ch_indices:
-                        st.session_state.tts_selected_stories.discard(idx)
+                    st.session_state.tts_selected_stories.difference_update(ch_indices)
+                    st.session_state.tts_editor_version += 1
                     st.rerun()
-            
-            # Show stories
-            for story in ch_stories:
-                idx = st.session_state.tts_scanned_stories.index(story)
-                status = "🔊" if story['has_audio'] else "⏳"
-                label = f"{status} Story {story['story_number']}: {story['title'][:60]}..."
-                
-                is_selected = idx in st.session_state.tts_selected_stories
-                
-                if st.checkbox(label, value=is_selected, key=f"tts_cb_{idx}"):
-                    st.session_state.tts_selected_stories.add(idx)
-                else:
-                    st.session_state.tts_selected_stories.discard(idx)
-            
-            st.markdown("---")
+        
+        # Show stories - one data editor instead of a checkbox widget per story
+        stories_df = pd.DataFrame({
+            'Select': df.index.isin(list(st.session_state.tts_selected_stories)),
+            'Channel': df['channel_name'],
+            'Story': df['story_number'],
+            'Title': df['title'].str.slice(0, 60),
+            'Status': np.where(df['has_audio'], "🔊", "⏳"),
+        })
+        
+        edited_df = st.data_editor(
+            stories_df,
+            column_config={'Select': st.column_config.CheckboxColumn()},
+            disabled=['Channel', 'Story', 'Title', 'Status'],
+            hide_index=True,
+            num_rows='fixed',
+            width='stretch',
+            key=f"tts_story_editor_{st.session_state.tts_editor_version}"
+        )
+        st.session_state.tts_selected_stories = set(edited_df.index[edited_df['Select']].tolist())
+        
+        st.markdown("---")
         
         # Show selected count
         total_selected = len(st.session_state.tts_selected_stories)
@@ -192,12 +565,12 @@ class TTSProcessorApp:
             # Skip existing toggle
             skip_existing = st.checkbox("Skip stories with existing audio", value=True, key="tts_skip_existing")
             
+            # Concurrent requests to the TTS server
+            st.slider("Parallel Requests", min_value=1, max_value=16, value=4, key="tts_parallel",
+                      help="Stories sent to the TTS server at the same time")
+            
             # Filter stories to process
-            to_process = []
-            for idx in st.session_state.tts_selected_stories:
-                story = st.session_state.tts_scanned_stories[idx]
-                if not skip_existing or not story['has_audio']:
-                    to_process.append(story)
+            to_process = self._stories_to_process(skip_existing)
             
             if len(to_process) == 0:
                 st.warning("⚠️ No stories to process (all have audio)")
@@ -215,40 +588,62 @@ class TTSProcessorApp:
             st.markdown("---")
             st.markdown("### 🎙️ Generating Audio with Kokoro TTS")
             
-            processor = TTSProcessor(st.session_state.tts_endpoint)
+            processor = self._get_processor()
             voice = st.session_state.get('tts_voice', 'af_sky')
             skip_existing = st.session_state.get('tts_skip_existing', True)
             
             # Get stories to process
-            to_process = []
-            for idx in st.session_state.tts_selected_stories:
-                story = st.session_state.tts_scanned_stories[idx]
-                if not skip_existing or not story['has_audio']:
-                    to_process.append(story)
+            to_process = self._stories_to_process(skip_existing)
             
             progress_bar = st.progress(0)
             status_text = st.empty()
             
             success_count = 0
+            completed_count = 0
+            max_workers = st.session_state.get('tts_parallel', 4)
+            status_text.text(f"Generating {len(to_process)} stories ({max_workers} at a time)...")
             
-            for i, story in enumerate(to_process):
-                status_text.text(f"Generating {i+1}/{len(to_process)}: Story {story['story_number']}...")
-                
-                try:
-                    # Read story text
-                    with open(story['story_file'], 'r', encoding='utf-8') as f:
-                        story_text = f.read()
+            def record_result(story, error):
+                nonlocal success_count, completed_count
+                completed_count += 1
+                if error is None:
+                    success_count += 1
+                else:
+                    st.error(f"❌ Failed Story {story['story_number']}: {str(error)}")
+                status_text.text(f"Generated {completed_count}/{len(to_process)}: Story {story['story_number']}")
+                progress_bar.progress(completed_count / len(to_process))
+            
+            def collect(futures):
+                for future in futures:
+                    record_result(pending.pop(future), future.exception())
+            
+            # A reader thread loads texts while requests are in flight. Up to 2 * max_workers
+            # texts wait in the queue and up to 2 * max_workers more are submitted, so roughly
+            # 4 * max_workers texts (plus the one being read) are held in memory at once
+            text_queue = queue.Queue(maxsize=max_workers * 2)
+            reader = threading.Thread(target=processor.read_story_texts, args=(to_process, text_queue), daemon=True)
+            reader.start()
+            
+            # Requests run in worker threads; Streamlit calls stay on this thread
+            pending = {}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while True:
+                    item = text_queue.get()
+                    if item is None:
+                        break
                     
-                    # Generate audio
-                    mp3_path = story['story_folder'] / f"Story_{story['story_number']}.mp3"
-                    processor.generate_audio(story_text, mp3_path, voice)
+                    story, story_text, read_error = item
+                    if read_error is not None:
+                        record_result(story, read_error)
+                        continue
                     
-                    success_count += 1
+                    if len(pending) >= max_workers * 2:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
                     
-                except Exception as e:
-                    st.error(f"❌ Failed Story {story['story_number']}: {str(e)}")
+                    pending[executor.submit(processor.generate_audio, story_text, story['mp3_path'], voice)] = story
                 
-                progress_bar.progress((i + 1) / len(to_process))
+                collect(as_completed(list(pending)))
             
             status_text.empty()
             progress_bar.empty()
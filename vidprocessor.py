@@ -4,30 +4,118 @@ Requires NVIDIA GPU with CUDA support - NO CPU FALLBACK
 """
 
 import streamlit as st
-import shutil
+import os
 from pathlib import Path
 import json
 import random
 import time
+import queue
+import threading
+from functools import lru_cache
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import video processing modules (user must have these)
 try:
     from modules.video_processor import (
         check_ffmpeg_available, check_gpu_available, get_media_duration,
-        loop_video_to_match_audio, get_audio_name_from_path,
-        process_videos_smart, format_time
+        get_audio_name_from_path,
+        process_videos_smart, process_story_single_pass, prepare_background_video,
+        get_gpu_count, format_time
     )
     from modules.audio_handler import save_uploaded_file
     from modules.caption_generator import (
-        load_whisper_model, transcribe_audio, create_ass_file
+        load_whisper_model, load_batched_pipeline, transcribe_audio, create_ass_file
     )
-    from modules.subtitle_applier import burn_subtitles
-    from modules.video_overlay import apply_video_overlay_smart, get_video_duration
+    from modules.video_overlay import get_video_duration
     MODULES_AVAILABLE = True
 except ImportError:
     MODULES_AVAILABLE = False
 
 
+def load_json(path):
+    """Load a JSON file, using orjson on the raw bytes when available"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1024)
+def hex_to_ass(hex_color):
+    """Convert #RRGGBB to an ASS &H00BBGGRR colour"""
+    v = int(hex_color.lstrip('#'), 16)
+    return f"&H00{v & 0xFF:02X}{(v >> 8) & 0xFF:02X}{(v >> 16) & 0xFF:02X}"
+
+
+@lru_cache(maxsize=1024)
+def hex_to_ass_alpha(hex_color, alpha):
+    """Convert #RRGGBB plus 0-255 opacity to an ASS &HAABBGGRR colour"""
+    v = int(hex_color.lstrip('#'), 16)
+    return f"&H{255 - alpha:02X}{v & 0xFF:02X}{(v >> 8) & 0xFF:02X}{(v >> 16) & 0xFF:02X}"
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _ffmpeg_ok():
+    """check_ffmpeg_available, cached so reruns don't fork ffmpeg/ffprobe"""
+    return check_ffmpeg_available()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _gpu_ok():
+    """check_gpu_available, cached so reruns don't fork ffmpeg -encoders"""
+    return check_gpu_available()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_whisper(model_size, device, compute_type):
+    """Load the Whisper model once and keep it resident across reruns"""
+    return load_batched_pipeline(load_whisper_model(model_size, device=device, compute_type=compute_type))
+
+
+# Single background deleter shared by all reruns (the app object is rebuilt on every rerun)
+_cleanup_queue = queue.Queue()
+_cleanup_thread = None
+_cleanup_lock = threading.Lock()
+
+
+def _cleanup_worker():
+    """Delete queued temp files forever"""
+    while True:
+        paths = _cleanup_queue.get()
+        for path in paths:
+            try:
+                Path(path).unlink(missing_ok=True)
+            except:
+                pass
+
+
+def schedule_cleanup(paths):
+    """Queue temp files for deletion on the background cleaner thread"""
+    global _cleanup_thread
+    with _cleanup_lock:
+        if _cleanup_thread is None:
+            _cleanup_thread = threading.Thread(target=_cleanup_worker, daemon=True)
+            _cleanup_thread.start()
+    _cleanup_queue.put(list(paths))
+
+
+def _read_metadata(path):
+    """Read one metadata.json, returning {} if missing or invalid"""
+    if path is None:
+        return {}
+    try:
+        return load_json(path)
+    except:
+        return {}
+
+
 class VideoProcessorScanner:
     def __init__(self):
         self.temp_dir = Path("temp_video_processing")
@@ -36,51 +124,63 @@ class VideoProcessorScanner:
     def scan_rewritten_folders(self, project_path):
         """Scan project for stories with audio files ready for video processing"""
         stories_data = []
+        metadata_paths = []
         project_path = Path(project_path)
         
         # Scan all channel folders
-        for channel_dir in sorted(project_path.iterdir()):
-            if not channel_dir.is_dir() or channel_dir.name in ['__pycache__', '.git']:
+        with os.scandir(project_path) as it:
+            channel_entries = sorted(
+                (e for e in it if e.name not in ['__pycache__', '.git'] and e.is_dir()),
+                key=lambda e: e.name
+            )
+        
+        for channel_entry in channel_entries:
+            rewritten_dir = Path(channel_entry.path) / "Rewritten"
+            if not rewritten_dir.is_dir():
                 continue
             
-            rewritten_dir = channel_dir / "Rewritten"
-            if not rewritten_dir.exists():
-                continue
+            # Scan story folders (parse each folder number once, then sort on it)
+            entries = []
+            with os.scandir(rewritten_dir) as it:
+                for e in it:
+                    if not e.name.isdigit() or not e.is_dir():
+                        continue
+                    entries.append((int(e.name), e.name))
+            entries.sort(key=itemgetter(0))
             
-            # Scan story folders
-            for story_folder in sorted(rewritten_dir.iterdir(), key=lambda x: int(x.name) if x.name.isdigit() else 999999):
-                if not story_folder.is_dir() or not story_folder.name.isdigit():
-                    continue
+            for _, story_number in entries:
+                story_folder = rewritten_dir / story_number
+                
+                # One directory listing instead of a stat per file
+                with os.scandir(story_folder) as it:
+                    files = {e.name for e in it}
                 
                 # Check if audio exists
-                audio_file = story_folder / f"Story_{story_folder.name}.mp3"
-                if not audio_file.exists():
+                audio_name = f"Story_{story_number}.mp3"
+                if audio_name not in files:
                     continue
                 
                 # Check if video already exists
-                video_file = story_folder / f"Story_{story_folder.name}.mp4"
-                has_video = video_file.exists()
-                
-                # Load metadata
-                metadata_file = story_folder / "metadata.json"
-                metadata = {}
-                if metadata_file.exists():
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                    except:
-                        pass
+                video_name = f"Story_{story_number}.mp4"
+                has_video = video_name in files
                 
                 stories_data.append({
-                    'channel_name': channel_dir.name,
-                    'story_number': story_folder.name,
+                    'channel_name': channel_entry.name,
+                    'story_number': story_number,
                     'story_folder': story_folder,
-                    'audio_path': audio_file,
-                    'video_path': video_file,
-                    'has_video': has_video,
-                    'title': metadata.get('title', f'Story {story_folder.name}'),
-                    'metadata': metadata
+                    'audio_path': story_folder / audio_name,
+                    'video_path': story_folder / video_name,
+                    'has_video': has_video
                 })
+                metadata_paths.append(story_folder / "metadata.json" if "metadata.json" in files else None)
+        
+        # Read all metadata files concurrently, then attach them in scan order
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            metadatas = list(executor.map(_read_metadata, metadata_paths))
+        
+        for story, metadata in zip(stories_data, metadatas):
+            story['title'] = metadata.get('title', f"Story {story['story_number']}")
+            story['metadata'] = metadata
         
         return stories_data
 
@@ -95,8 +195,64 @@ class VideoProcessorApp:
             st.session_state.vp_scanned_stories = []
         if 'vp_selected_stories' not in st.session_state:
             st.session_state.vp_selected_stories = set()
+        if 'vp_selected_sorted' not in st.session_state:
+            st.session_state.vp_selected_sorted = sorted(st.session_state.vp_selected_stories)
         if 'vp_uploaded_videos' not in st.session_state:
             st.session_state.vp_uploaded_videos = []
+        if 'vp_video_names' not in st.session_state:
+            st.session_state.vp_video_names = [Path(vp).name for vp in st.session_state.vp_uploaded_videos]
+    
+    def _refresh_selected_sorted(self):
+        """Re-sort the selection; only called when vp_selected_stories changes"""
+        st.session_state.vp_selected_sorted = sorted(st.session_state.vp_selected_stories)
+    
+    def _process_one(self, story, story_idx, video_file, whisper_model, caption_settings,
+                     quality_preset, overlay_path, overlay_settings, updates, gpu_id=0,
+                     mux_subtitles=False):
+        """Transcribe, caption and render one story; runs in a worker thread, so no st.* calls"""
+        story_start_time = time.time()
+        audio_file = str(story['audio_path'])
+        subtitle_path = self.temp_dir / f"subtitles_{story_idx}_{story['story_number']}.ass"
+        temp_output = story['video_path'].with_name(f"{story['video_path'].stem}.part.mp4")
+        
+        try:
+            # Transcribe audio
+            updates.put((story_idx, 0, "🎤 Transcribing audio with GPU..."))
+            result = transcribe_audio(whisper_model, audio_file)
+            
+            if not result['segments']:
+                return False, time.time() - story_start_time, "No speech detected"
+            
+            # Create ASS subtitles with karaoke
+            updates.put((story_idx, 20, "📝 Creating ASS subtitles with karaoke colors..."))
+            create_ass_file(result['segments'], str(subtitle_path), **caption_settings)
+            
+            # Loop, burn subtitles and apply overlay in one GPU pass
+            if mux_subtitles:
+                updates.put((story_idx, 30, "📎 Looping video and muxing subtitles..."))
+            elif overlay_path:
+                updates.put((story_idx, 30, "🎬 GPU: Looping video, burning subtitles and applying overlay (single pass)..."))
+            else:
+                updates.put((story_idx, 30, "🔥 GPU: Looping video and burning subtitles (single pass)..."))
+            final_output = story['video_path']
+            
+            # Render next to the final file and rename it into place (no copy, never half-written)
+            process_story_single_pass(
+                video_file, audio_file, str(subtitle_path), str(temp_output),
+                quality_preset=quality_preset,
+                overlay_path=overlay_path,
+                overlay_settings=overlay_settings,
+                gpu_id=gpu_id,
+                mux_subtitles=mux_subtitles
+            )
+            os.replace(temp_output, final_output)
+            
+            return True, time.time() - story_start_time, final_output.name
+        except Exception as e:
+            return False, time.time() - story_start_time, str(e)
+        finally:
+            # Cleanup temp files off the worker so the next story starts right away
+            schedule_cleanup([subtitle_path, temp_output])
     
     def run(self):
         # Check modules
@@ -117,13 +273,13 @@ class VideoProcessorApp:
             return
         
         # Check FFmpeg
-        ffmpeg_ok, ffmpeg_err = check_ffmpeg_available()
+        ffmpeg_ok, ffmpeg_err = _ffmpeg_ok()
         if not ffmpeg_ok:
             st.error(f"❌ FFmpeg not available: {ffmpeg_err}")
             return
         
         # Check GPU (REQUIRED - no CPU fallback)
-        gpu_available = check_gpu_available()
+        gpu_available = _gpu_ok()
         if not gpu_available:
             st.error("❌ **NVIDIA GPU with NVENC not detected!**")
             st.error("This version requires GPU. Please check:")
@@ -144,6 +300,7 @@ class VideoProcessorApp:
         if st.button("🔍 Scan Rewritten Folders for Stories with Audio", width='stretch', key="vp_scan_btn"):
             st.session_state.vp_scanned_stories = self.scanner.scan_rewritten_folders(st.session_state.current_project_path)
             st.session_state.vp_selected_stories = set()
+            self._refresh_selected_sorted()
             st.rerun()
         
         if not st.session_state.vp_scanned_stories:
@@ -152,60 +309,73 @@ class VideoProcessorApp:
         
         st.success(f"📋 Found {len(st.session_state.vp_scanned_stories)} stories with audio")
         
-        # Group by channel
-        channels = {}
-        for story in st.session_state.vp_scanned_stories:
-            ch_name = story['channel_name']
-            if ch_name not in channels:
-                channels[ch_name] = []
-            channels[ch_name].append(story)
+        # Group by channel once per scan, keeping each story's index into vp_scanned_stories
+        if st.session_state.get('vp_channels_src') is not st.session_state.vp_scanned_stories:
+            channels = {}
+            for idx, story in enumerate(st.session_state.vp_scanned_stories):
+                ch_name = story['channel_name']
+                if ch_name not in channels:
+                    channels[ch_name] = []
+                channels[ch_name].append((idx, story))
+            st.session_state.vp_channels = sorted(channels.items())
+            st.session_state.vp_channels_src = st.session_state.vp_scanned_stories
         
         # Select All / Deselect All
         col1, col2 = st.columns(2)
         with col1:
             if st.button("☑️ Select All", width='stretch', key="vp_select_all"):
                 st.session_state.vp_selected_stories = set(range(len(st.session_state.vp_scanned_stories)))
+                self._refresh_selected_sorted()
                 st.rerun()
         with col2:
             if st.button("☐ Deselect All", width='stretch', key="vp_deselect_all"):
                 st.session_state.vp_selected_stories = set()
+                self._refresh_selected_sorted()
                 st.rerun()
         
         st.markdown("---")
         
         # Show stories grouped by channel
-        for ch_name, ch_stories in sorted(channels.items()):
+        selection_changed = False
+        for ch_name, ch_stories in st.session_state.vp_channels:
             st.markdown(f"### 📁 {ch_name} ({len(ch_stories)} stories)")
             
             # Channel select/deselect
             col1, col2 = st.columns(2)
-            ch_indices = [i for i, s in enumerate(st.session_state.vp_scanned_stories) if s['channel_name'] == ch_name]
+            ch_indices = [idx for idx, _ in ch_stories]
             
             with col1:
                 if st.button(f"☑️ Select All", key=f"vp_select_ch_{ch_name}", width='stretch'):
                     st.session_state.vp_selected_stories.update(ch_indices)
+                    self._refresh_selected_sorted()
                     st.rerun()
             with col2:
                 if st.button(f"☐ Deselect All", key=f"vp_deselect_ch_{ch_name}", width='stretch'):
                     for idx in ch_indices:
                         st.session_state.vp_selected_stories.discard(idx)
+                    self._refresh_selected_sorted()
                     st.rerun()
             
             # Show stories
-            for story in ch_stories:
-                idx = st.session_state.vp_scanned_stories.index(story)
+            for idx, story in ch_stories:
                 status = "🎬" if story['has_video'] else "⏳"
                 label = f"{status} Story {story['story_number']}: {story['title'][:60]}..."
                 
                 is_selected = idx in st.session_state.vp_selected_stories
+                checked = st.checkbox(label, value=is_selected, key=f"vp_cb_{idx}")
                 
-                if st.checkbox(label, value=is_selected, key=f"vp_cb_{idx}"):
-                    st.session_state.vp_selected_stories.add(idx)
-                else:
-                    st.session_state.vp_selected_stories.discard(idx)
+                if checked != is_selected:
+                    if checked:
+                        st.session_state.vp_selected_stories.add(idx)
+                    else:
+                        st.session_state.vp_selected_stories.discard(idx)
+                    selection_changed = True
             
             st.markdown("---")
         
+        if selection_changed:
+            self._refresh_selected_sorted()
+        
         # Show selected count
         total_selected = len(st.session_state.vp_selected_stories)
         if total_selected == 0:
@@ -233,10 +403,21 @@ class VideoProcessorApp:
             video_paths = []
             for vid in uploaded_videos:
                 vid_path = self.temp_dir / vid.name
-                save_uploaded_file(vid, vid_path)
-                video_paths.append(str(vid_path))
+                # Reruns re-deliver the same uploads; skip files already on disk
+                if not (vid_path.exists() and vid_path.stat().st_size == vid.size):
+                    save_uploaded_file(vid, vid_path)
+                
+                # Transcode once to H.264 yuv420p if NVDEC can't decode it well (cached across stories and reruns)
+                try:
+                    with st.spinner(f"Preparing {vid.name} for GPU decoding..."):
+                        video_paths.append(prepare_background_video(vid_path, self.temp_dir / "gpu_cache"))
+                except Exception as e:
+                    st.warning(f"⚠️ Could not pre-transcode {vid.name}, using it as uploaded: {e}")
+                    video_paths.append(str(vid_path))
             
-            st.session_state.vp_uploaded_videos = video_paths
+            if video_paths != st.session_state.vp_uploaded_videos:
+                st.session_state.vp_uploaded_videos = video_paths
+                st.session_state.vp_video_names = [Path(vp).name for vp in video_paths]
         
         if not st.session_state.vp_uploaded_videos:
             st.info("👆 Please upload at least one background video")
@@ -249,8 +430,8 @@ class VideoProcessorApp:
         
         assignment_mode = st.radio("Assignment mode:", ["Random", "Manual"], key="vp_assignment_mode")
         
-        selected_stories = [st.session_state.vp_scanned_stories[i] for i in sorted(st.session_state.vp_selected_stories)]
-        video_names = [Path(vp).name for vp in st.session_state.vp_uploaded_videos]
+        selected_stories = [st.session_state.vp_scanned_stories[i] for i in st.session_state.vp_selected_sorted]
+        video_names = st.session_state.vp_video_names
         
         assignments = {}
         
@@ -329,6 +510,13 @@ class VideoProcessorApp:
                 fade_in = st.slider("Fade In (sec)", 0.0, 2.0, 0.0, 0.1, key="vp_fade_in")
                 fade_out = st.slider("Fade Out (sec)", 0.0, 2.0, 0.0, 0.1, key="vp_fade_out")
         
+        mux_subtitles = st.checkbox(
+            "📎 Mux subtitles instead of burning (stream copy)",
+            value=False,
+            help="Adds a soft subtitle track and skips the re-encode when possible. Styling and karaoke colors are not kept.",
+            key="vp_mux_subs"
+        )
+        
         st.markdown("---")
         
         # STEP 5: Video Overlay (Green Screen)
@@ -338,13 +526,15 @@ class VideoProcessorApp:
         
         overlay_path = None
         overlay_settings = {}
+        overlay_range_invalid = False
         
         if enable_overlay:
             uploaded_overlay = st.file_uploader("Upload Overlay Video (with green screen)", type=['mp4', 'mov', 'webm'], key="vp_overlay_video")
             
             if uploaded_overlay:
                 overlay_path = self.temp_dir / uploaded_overlay.name
-                save_uploaded_file(uploaded_overlay, overlay_path)
+                if not (overlay_path.exists() and overlay_path.stat().st_size == uploaded_overlay.size):
+                    save_uploaded_file(uploaded_overlay, overlay_path)
                 
                 try:
                     overlay_duration = get_video_duration(str(overlay_path))
@@ -383,6 +573,7 @@ class VideoProcessorApp:
                             
                             if overlay_end <= overlay_start:
                                 st.error("End time must be greater than start time")
+                                overlay_range_invalid = True
                             else:
                                 st.info(f"✨ **Optimized GPU:** Only encoding {overlay_end - overlay_start}s (15x faster!)")
                         else:
@@ -414,6 +605,11 @@ class VideoProcessorApp:
         with col_gpu1:
             st.markdown("**🤖 Whisper Model**")
             whisper_model_size = st.selectbox("Model", ["tiny", "base", "small", "medium"], index=1, key="vp_whisper_model")
+            whisper_int8 = st.checkbox(
+                "⚡ INT8 quantized Whisper (faster, same quality for tiny/base/small)",
+                value=whisper_model_size in {"tiny", "base", "small"},
+                key=f"vp_whisper_int8_{whisper_model_size}"
+            )
             st.info("💡 Using GPU (CUDA) for Whisper")
         
         with col_gpu2:
@@ -430,6 +626,9 @@ class VideoProcessorApp:
                 key="vp_quality"
             )
         
+        # Stories are spread round-robin across all detected GPUs
+        num_gpus = get_gpu_count()
+        
         # Parallel workers slider (only for multiple videos)
         if len(selected_stories) > 1:
             st.markdown("**⚙️ Parallel GPU Processing**")
@@ -440,7 +639,7 @@ class VideoProcessorApp:
                 value=2, # Default to 2 parallel workers
                 key="vp_max_workers"
             )
-            st.info(f"🚀 Will process **{min(len(selected_stories), max_workers)} videos simultaneously** on GPU")
+            st.info(f"🚀 Will process **{min(len(selected_stories), max_workers)} videos simultaneously** on {num_gpus} GPU(s)")
         else:
             max_workers = 1
             st.info("🎬 Single video - using direct GPU processing")
@@ -449,14 +648,22 @@ class VideoProcessorApp:
         
         # STEP 7: Process
         if st.button("🚀 START GPU PROCESSING", type="primary", width='stretch', key="vp_process"):
+            if overlay_range_invalid:
+                st.error("❌ Overlay end time must be greater than start time")
+                return
+            
             # Load Whisper model
             with st.spinner(f"Loading Whisper model ({whisper_model_size}) on GPU..."):
                 try:
-                    whisper_model = load_whisper_model(
-                        whisper_model_size,
-                        device="cuda",
-                        compute_type="float16"
-                    )
+                    compute_type = "int8_float16" if whisper_int8 else "float16"
+                    try:
+                        whisper_model = _get_whisper(whisper_model_size, "cuda", compute_type)
+                    except ValueError:
+                        # CTranslate2 rejects int8_float16 on GPUs without int8 kernels (pre-Turing)
+                        if compute_type == "float16":
+                            raise
+                        st.warning("⚠️ INT8 not supported on this GPU, falling back to float16")
+                        whisper_model = _get_whisper(whisper_model_size, "cuda", "float16")
                     st.success("✅ Whisper model loaded on GPU")
                 except Exception as e:
                     st.error(f"❌ Failed to load Whisper: {e}")
@@ -468,153 +675,95 @@ class VideoProcessorApp:
             else:
                 st.info(f"🚀 Processing {len(selected_stories)} videos (parallel GPU mode with {max_workers} workers)")
             
+            caption_settings = dict(
+                font_name=font_name, font_size=font_size,
+                primary_color=hex_to_ass(main_text_color), outline_color=hex_to_ass(outline_color),
+                back_color=hex_to_ass_alpha(back_color_hex, back_opacity), bold=bold, italic=italic,
+                underline=underline, shadow_depth=shadow_depth,
+                outline_width=outline_width, alignment=alignment,
+                margin_v=margin_v, margin_h=0,
+                scale_x=scale_x, scale_y=scale_y, spacing=spacing,
+                blur_edges=blur_edges, fade_in=fade_in,
+                fade_out=fade_out, enable_karaoke=enable_karaoke,
+                karaoke_main_color=hex_to_ass(main_text_color),
+                karaoke_speaking_color=hex_to_ass(speaking_word_color)
+            )
+            
+            use_overlay = enable_overlay and overlay_path and overlay_path.exists()
+            
             processed_count = 0
             failed_count = 0
             total_processing_time = 0
             
-            # Process each story
+            # One progress bar + status line per story, updated from the script thread only
+            story_slots = {}
             for story_idx, story in enumerate(selected_stories):
-                story_start_time = time.time()
+                video_file = st.session_state.vp_uploaded_videos[assignments[story_idx]]
                 
-                st.markdown(f"### 🎬 Processing Story {story_idx + 1}/{len(selected_stories)}")
+                st.markdown(f"### 🎬 Story {story_idx + 1}/{len(selected_stories)}")
                 st.markdown(f"**Story {story['story_number']}:** {story['title']}")
-                
-                audio_file = str(story['audio_path'])
-                video_idx = assignments[story_idx]
-                video_file = st.session_state.vp_uploaded_videos[video_idx]
-                
-                st.markdown(f"**Audio:** {Path(audio_file).name}")
+                st.markdown(f"**Audio:** {Path(story['audio_path']).name}")
                 st.markdown(f"**Background:** {Path(video_file).name}")
                 
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                status_text.text("⏳ Queued...")
+                story_slots[story_idx] = (progress_bar, status_text)
+            
+            updates = queue.Queue()
+            batch_start_time = time.time()
+            
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    executor.submit(
+                        self._process_one, story, story_idx,
+                        st.session_state.vp_uploaded_videos[assignments[story_idx]],
+                        whisper_model, caption_settings, quality_preset,
+                        str(overlay_path) if use_overlay else None, overlay_settings, updates,
+                        gpu_id=story_idx % num_gpus, mux_subtitles=mux_subtitles
+                    ): story_idx
+                    for story_idx, story in enumerate(selected_stories)
+                }
+                pending = set(futures)
                 
-                try:
-                    # Transcribe audio
-                    status_text.text("🎤 Transcribing audio with GPU...")
-                    result = transcribe_audio(whisper_model, audio_file)
-                    
-                    if not result['segments']:
-                        st.error(f"❌ No speech detected")
-                        failed_count += 1
-                        continue
-                    
-                    progress_bar.progress(20)
-                    
-                    # Create ASS subtitles with karaoke
-                    status_text.text("📝 Creating ASS subtitles with karaoke colors...")
-                    
-                    def hex_to_ass(hex_color):
-                        hex_color = hex_color.lstrip('#')
-                        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                        return f"&H00{b:02X}{g:02X}{r:02X}"
-                    
-                    def hex_to_ass_alpha(hex_color, alpha):
-                        hex_color = hex_color.lstrip('#')
-                        r, g, b = int(hex_color[0:2], 16), int(hex_color[2:4], 16), int(hex_color[4:6], 16)
-                        alpha_inv = 255 - alpha
-                        return f"&H{alpha_inv:02X}{b:02X}{g:02X}{r:02X}"
-                    
-                    primary_col = hex_to_ass(main_text_color)
-                    outline_col = hex_to_ass(outline_color)
-                    back_col = hex_to_ass_alpha(back_color_hex, back_opacity)
-                    karaoke_main_col = hex_to_ass(main_text_color)
-                    karaoke_speaking_col = hex_to_ass(speaking_word_color)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
                     
-                    subtitle_path = self.temp_dir / f"subtitles_{story['story_number']}.ass"
+                    # Drain stage updates posted by the workers
+                    while True:
+                        try:
+                            story_idx, pct, text = updates.get_nowait()
+                        except queue.Empty:
+                            break
+                        progress_bar, status_text = story_slots[story_idx]
+                        progress_bar.progress(pct)
+                        status_text.text(text)
                     
-                    create_ass_file(
-                        result['segments'], str(subtitle_path),
-                        font_name=font_name, font_size=font_size,
-                        primary_color=primary_col, outline_color=outline_col,
-                        back_color=back_col, bold=bold, italic=italic,
-                        underline=underline, shadow_depth=shadow_depth,
-                        outline_width=outline_width, alignment=alignment,
-                        margin_v=margin_v, margin_h=0,
-                        scale_x=scale_x, scale_y=scale_y, spacing=spacing,
-                        blur_edges=blur_edges, fade_in=fade_in,
-                        fade_out=fade_out, enable_karaoke=enable_karaoke,
-                        karaoke_main_color=karaoke_main_col,
-                        karaoke_speaking_color=karaoke_speaking_col
-                    )
-                    
-                    progress_bar.progress(30)
-                    
-                    # Loop video to match audio (GPU)
-                    status_text.text("🔄 GPU: Matching video to audio duration...")
-                    temp_combined = self.temp_dir / f"combined_{story['story_number']}.mp4"
-                    
-                    _, video_time = loop_video_to_match_audio(
-                        video_file, audio_file, str(temp_combined),
-                        quality_preset=quality_preset
-                    )
-                    
-                    progress_bar.progress(50)
-                    
-                    # Burn subtitles (GPU)
-                    status_text.text("🔥 GPU: Burning subtitles...")
-                    temp_with_subs = self.temp_dir / f"with_subs_{story['story_number']}.mp4"
-                    
-                    burn_subtitles(
-                        str(temp_combined), str(subtitle_path), str(temp_with_subs),
-                        quality_preset=quality_preset
-                    )
-                    
-                    progress_bar.progress(70)
-                    
-                    # Apply overlay if enabled (GPU OPTIMIZED)
-                    if enable_overlay and overlay_path and overlay_path.exists():
-                        status_text.text("🎬 GPU: Applying optimized video overlay (stream copy)...")
-                        final_output = story['video_path']
+                    for future in done:
+                        story_idx = futures[future]
+                        story = selected_stories[story_idx]
+                        progress_bar, status_text = story_slots[story_idx]
+                        ok, story_time, msg = future.result()
                         
-                        apply_video_overlay_smart(
-                            str(temp_with_subs), str(overlay_path), str(final_output),
-                            timing_mode=overlay_settings['timing_mode'],
-                            start_time=overlay_settings['start_time'],
-                            end_time=overlay_settings['end_time'],
-                            position=overlay_settings['position'],
-                            size_percent=overlay_settings['size_percent'],
-                            remove_green=overlay_settings['remove_green'],
-                            green_similarity=overlay_settings['green_similarity'],
-                            green_blend=overlay_settings['green_blend'],
-                            keep_overlay_audio=overlay_settings['keep_overlay_audio'],
-                            quality_preset=quality_preset,
-                            optimize=True  # Use optimized stream copy
-                        )
-                    else:
-                        final_output = story['video_path']
-                        shutil.copy(str(temp_with_subs), str(final_output))
-                    
-                    progress_bar.progress(100)
-                    
-                    # Calculate time
-                    story_time = time.time() - story_start_time
-                    total_processing_time += story_time
-                    
-                    status_text.text(f"✅ Complete in {format_time(story_time)}!")
-                    processed_count += 1
-                    
-                    st.success(f"✅ **Story {story['story_number']}** → **{final_output.name}** ({format_time(story_time)})")
-                    
-                    # Show estimated time remaining
-                    if story_idx < len(selected_stories) - 1:
-                        avg_time = total_processing_time / (story_idx + 1)
-                        remaining = (len(selected_stories) - story_idx - 1) * avg_time
-                        st.info(f"⏱️ Estimated time remaining: {format_time(remaining)}")
-                    
-                    # Cleanup temp files
-                    try:
-                        subtitle_path.unlink(missing_ok=True)
-                        temp_combined.unlink(missing_ok=True)
-                        temp_with_subs.unlink(missing_ok=True)
-                    except:
-                        pass
-                    
-                except Exception as e:
-                    story_time = time.time() - story_start_time
-                    failed_count += 1
-                    st.error(f"❌ Error processing Story {story['story_number']}: {str(e)}")
-                    continue
+                        if ok:
+                            processed_count += 1
+                            total_processing_time += story_time
+                            progress_bar.progress(100)
+                            status_text.text(f"✅ Complete in {format_time(story_time)}!")
+                            st.success(f"✅ **Story {story['story_number']}** → **{msg}** ({format_time(story_time)})")
+                        else:
+                            failed_count += 1
+                            status_text.text(f"❌ {msg}")
+                            st.error(f"❌ Error processing Story {story['story_number']}: {msg}")
+                        
+                        # Show estimated time remaining
+                        completed = processed_count + failed_count
+                        if completed < len(selected_stories):
+                            elapsed = time.time() - batch_start_time
+                            remaining = elapsed / completed * (len(selected_stories) - completed)
+                            st.info(f"⏱️ Estimated time remaining: {format_time(remaining)}")
+            
+            batch_time = time.time() - batch_start_time
             
             # Final summary
             st.balloons()
@@ -627,7 +776,7 @@ class VideoProcessorApp:
             with col_sum2:
                 st.metric("❌ Failed", failed_count)
             with col_sum3:
-                st.metric("⏱️ Total Time", format_time(total_processing_time))
+                st.metric("⏱️ Total Time", format_time(batch_time))
             
             if processed_count > 0:
                 avg_time = total_processing_time / processed_count
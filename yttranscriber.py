@@ -1,105 +1,237 @@
 import streamlit as st
 import yt_dlp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 import time
-import random
 import re
+import threading
+import bisect
+import logging
 from datetime import datetime
+from operator import attrgetter
+from dataclasses import dataclass
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from manager import ProjectManager
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Transcript requests are network-bound, so several are kept in flight at once
+TRANSCRIPT_WORKERS = 8
+
+# Starting request budget for tactiq (requests/second), adapted on 429s
+TACTIQ_RATE = 2.0
+
+# Unflushed no-caption ids allowed before no_captions.json is rewritten
+NO_CAPTIONS_FLUSH_EVERY = 50
+
+# (connect, read) timeouts for tactiq requests, in seconds
+TACTIQ_TIMEOUT = (5, 30)
+
+_TACTIQ_URL = "https://tactiq-apps-prod.tactiq.io/transcript"
+
+# Shared by every request (requests doesn't mutate it); Content-Type covers the pre-serialized body
+_TACTIQ_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:143.0) Gecko/20100101 Firefox/143.0",
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Content-Type": "application/json",
+    "Origin": "https://tactiq.io",
+    "Referer": "https://tactiq.io/",
+    "Connection": "keep-alive",
+}
+
+# Filename sanitizing: deletion table for illegal characters, compiled whitespace collapse
+_BAD_TABLE = str.maketrans('', '', '<>:"/\\|?*')
+_WS = re.compile(r'\s+')
+
+def write_json_file(path, data):
+    """Write indented JSON (orjson when available) and swap it into place atomically"""
+    if orjson is not None:
+        payload = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+class TokenBucket:
+    """Thread-safe token bucket; halves its rate on 429 and creeps back up on success (AIMD)"""
+    def __init__(self, rate, capacity=2, min_rate=0.1, max_rate=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.successes = 0
+        self.lock = threading.Lock()
+    
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+    
+    def penalize(self, retry_after=None):
+        """Rate limited: halve the rate and honour Retry-After if given"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.successes = 0
+            self.tokens = 0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+    
+    def reward(self):
+        """Successful request: add 0.1 req/s after every 10 in a row"""
+        with self.lock:
+            self.successes += 1
+            if self.successes >= 10:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+                self.successes = 0
+
+@dataclass(frozen=True)
+class VideoInfo:
+    """One entry of a channel listing"""
+    __slots__ = ('id', 'title', 'url', 'view_count', 'upload_date', 'duration')
+    id: str
+    title: str
+    url: str
+    view_count: int
+    upload_date: str
+    duration: int
+
 class YouTubeTranscriber:
     def __init__(self):
-        pass
+        # One pooled session so TCP/TLS connections to tactiq are reused across videos and workers
+        self.session = requests.Session()
+        # Connection errors and 5xx are retried by urllib3; 429s are left to the token bucket
+        retry = Retry(
+            total=5,
+            backoff_factor=1,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.rate_limiter = TokenBucket(TACTIQ_RATE)
+        # YoutubeDL isn't thread-safe: each listing thread builds one on first use and
+        # reuses it for later channels, so extractors aren't re-initialized per channel
+        self._ydl_local = threading.local()
+        self._ydl_instances = []
+        self._ydl_lock = threading.Lock()
+    
+    def close(self):
+        """Release the yt-dlp instances and HTTP session"""
+        with self._ydl_lock:
+            for ydl in self._ydl_instances:
+                ydl.close()
+            self._ydl_instances = []
+        self.session.close()
     
     def sanitize_filename(self, filename):
         """Remove or replace characters that aren't allowed in filenames"""
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'\s+', ' ', filename)
-        return filename.strip()[:200]
-    
-    def extract_channel_name(self, channel_url):
-        """Extract channel name from URL"""
-        ydl_opts = {'quiet': True}
-        try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(channel_url, download=False)
-                return info.get('channel', info.get('uploader', 'Unknown_Channel'))
-        except:
-            return 'Unknown_Channel'
+        return _WS.sub(' ', filename.translate(_BAD_TABLE)).strip()[:200]
     
     def extract_videos(self, channel_url, max_videos, sort_by):
-        """Extract video URLs and titles from a YouTube channel"""
-        ydl_opts = {
-            "extract_flat": False,
-            "dump_single_json": True,
-            "quiet": True
-        }
+        """Extract video URLs and titles from a YouTube channel; returns (channel_name, video_data)"""
+        ydl = getattr(self._ydl_local, 'ydl', None)
+        if ydl is None:
+            # Flat listing: one request per channel page instead of a full lookup per video
+            ydl = yt_dlp.YoutubeDL({
+                "extract_flat": "in_playlist",
+                "quiet": True,
+                "skip_download": True
+            })
+            self._ydl_local.ydl = ydl
+            with self._ydl_lock:
+                self._ydl_instances.append(ydl)
         
         if max_videos:
-            ydl_opts["playlistend"] = max_videos
+            ydl.params["playlistend"] = max_videos
+        else:
+            ydl.params.pop("playlistend", None)
+        
+        info = ydl.extract_info(channel_url, download=False)
+        videos = info.get("entries", [])
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(channel_url, download=False)
-            videos = info.get("entries", [])
+        # The listing already carries the channel name, no second lookup needed
+        channel_name = (info.get('channel') or info.get('uploader') or info.get('channel_id')
+                        or info.get('uploader_id') or 'Unknown_Channel')
             
-        video_data = []
-        for v in videos:
-            if v and v.get('id') and v.get('title'):
-                view_count = v.get('view_count', 0) or 0
-                video_info = {
-                    'id': v['id'],
-                    'title': v['title'],
-                    'url': f"https://www.youtube.com/watch?v={v['id']}",
-                    'view_count': view_count,
-                    'upload_date': v.get('upload_date', ''),
-                    'duration': v.get('duration', 0)
-                }
-                video_data.append(video_info)
+        # Flat entries may carry explicit None for fields they don't have
+        video_data = [
+            VideoInfo(
+                v['id'],
+                v['title'],
+                f"https://www.youtube.com/watch?v={v['id']}",
+                v.get('view_count') or 0,
+                v.get('upload_date') or '',
+                v.get('duration') or 0
+            )
+            for v in videos if v and v.get('id') and v.get('title')
+        ]
         
         # Sort based on user preference
         if sort_by == "Popularity":
-            video_data.sort(key=lambda x: x['view_count'], reverse=True)
-        else:  # Date
-            video_data.sort(key=lambda x: x['upload_date'], reverse=True)
+            video_data.sort(key=attrgetter('view_count'), reverse=True)
+        elif any(v.upload_date for v in video_data):  # Date
+            video_data.sort(key=attrgetter('upload_date'), reverse=True)
+        # Flat entries usually carry no upload_date; a channel's videos tab already lists newest first
         
-        return video_data
+        return channel_name, video_data
     
     def fetch_transcript(self, video_url, retries=5):
-        """Fetch transcript with retries"""
-        url = "https://tactiq-apps-prod.tactiq.io/transcript"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:143.0) Gecko/20100101 Firefox/143.0",
-            "Accept": "*/*",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Content-Type": "application/json",
-            "Origin": "https://tactiq.io",
-            "Referer": "https://tactiq.io/",
-            "Connection": "keep-alive",
-        }
-        
+        """Fetch transcript, retrying rate-limited (429) responses through the token bucket"""
         data = {"videoUrl": video_url, "langCode": "en"}
+        # Serialized once, reused across retries
+        payload = orjson.dumps(data) if orjson is not None else json.dumps(data).encode('utf-8')
         
         for attempt in range(1, retries + 1):
-            response = requests.post(url, headers=headers, json=data)
+            self.rate_limiter.acquire()
+            response = self.session.post(_TACTIQ_URL, headers=_TACTIQ_HEADERS, data=payload, timeout=TACTIQ_TIMEOUT)
             
             if response.status_code in (200, 201):
+                self.rate_limiter.reward()
+                # Decode the raw bytes directly; orjson.JSONDecodeError is a ValueError like the stdlib's
+                if orjson is not None:
+                    return orjson.loads(response.content)
                 return response.json()
             elif response.status_code == 429:
-                wait_time = min(60, 5 * attempt) + random.uniform(0, 3)
-                time.sleep(wait_time)
+                try:
+                    retry_after = float(response.headers.get("Retry-After"))
+                except (TypeError, ValueError):
+                    retry_after = None
+                self.rate_limiter.penalize(retry_after)
                 continue
             else:
                 return None
         
         return None
     
-    def transcribe_videos(self, project_path, channel_url, video_data, sort_by):
+    def transcribe_videos(self, project_path, channel_name, video_data, sort_by):
         """Transcribe videos and save to project structure"""
-        # Extract channel name
-        channel_name = self.extract_channel_name(channel_url)
         channel_name = self.sanitize_filename(channel_name)
         
         # Create channel folder structure using ProjectManager
@@ -108,70 +240,144 @@ class YouTubeTranscriber:
         
         # Transcripts go to: project_path/channel_name/transcripts/
         transcripts_dir = Path(channel_path) / "transcripts"
+        metadata_file = transcripts_dir / "metadata.json"
+        no_captions_file = transcripts_dir / "no_captions.json"
         
-        successful_transcripts = 0
+        # Resume: keep earlier entries and skip videos that already have a transcript
+        existing_metadata = []
+        if metadata_file.exists():
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    existing_metadata = json.load(f)
+            except (OSError, ValueError):
+                existing_metadata = []
+        done_ids = {entry.get('id') or entry['url'].rsplit('=', 1)[-1] for entry in existing_metadata}
+        
+        # Videos tactiq already answered with no captions are not asked for again
+        no_captions = set()
+        if no_captions_file.exists():
+            try:
+                with open(no_captions_file, 'r', encoding='utf-8') as f:
+                    no_captions = set(json.load(f))
+            except (OSError, ValueError):
+                no_captions = set()
+        unflushed = 0
+        
+        # New folders are numbered after the highest existing one so nothing is overwritten
+        next_folder = max((int(d.name) for d in transcripts_dir.iterdir() if d.name.isdigit()), default=0) + 1
+        pending = [v for v in video_data if v.id not in done_ids and v.id not in no_captions]
+        
+        # Per-video paths are built from this string prefix rather than Path objects
+        transcripts_dir_s = os.fspath(transcripts_dir)
+        
+        successful_transcripts = sum(1 for v in video_data if v.id in done_ids)
         total_videos = len(video_data)
+        total_pending = len(pending)
+        # (folder number, entry) pairs kept in video order as results arrive out of order
         metadata = []
         
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        for i, video_info in enumerate(video_data, 1):
-            if not st.session_state.yt_is_running:
-                break
-            
-            # Update progress
-            progress = i / total_videos
-            progress_bar.progress(progress)
-            status_text.text(f"Extracting transcripts: {i}/{total_videos}")
-            
-            video_url = video_info['url']
-            video_title = video_info['title']
+        # Fetch transcripts in parallel; files and widgets are only touched from this thread
+        executor = ThreadPoolExecutor(max_workers=TRANSCRIPT_WORKERS)
+        try:
+            futures = {
+                executor.submit(self.fetch_transcript, video_info.url): (i, video_info)
+                for i, video_info in enumerate(pending, next_folder)
+            }
+            not_done = set(futures)
+            completed = 0
+            last_ui = 0.0
+            write_failed = False
             
-            try:
-                resp_json = self.fetch_transcript(video_url)
-                if not resp_json:
-                    continue
-                
-                captions = resp_json.get("captions", [])
-                if not captions:
-                    continue
-                
-                transcript_text = " ".join(caption["text"] for caption in captions)
-                
-                if not transcript_text.strip():
-                    continue
-                
-                # Create numbered folder
-                folder_name = str(i)
-                video_folder = transcripts_dir / folder_name
-                video_folder.mkdir(parents=True, exist_ok=True)
-                
-                # Save transcript
-                filename = video_folder / "transcript.txt"
-                with open(filename, "w", encoding="utf-8") as f:
-                    f.write(transcript_text)
-                
-                # Add to metadata
-                metadata.append({
-                    "folder": folder_name,
-                    "title": video_title,
-                    "url": video_url,
-                    "views": video_info['view_count'],
-                    "upload_date": video_info['upload_date']
-                })
+            # Stop is a rerun: Streamlit raises its rerun exception at the next st.* call, so the
+            # loop polls and touches the status widget at least once per poll, even when idle
+            while not_done and not write_failed:
+                done, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
                 
-                successful_transcripts += 1
+                for future in done:
+                    completed += 1
+                    i, video_info = futures[future]
+                    video_url = video_info.url
+                    video_title = video_info.title
+                    
+                    try:
+                        resp_json = future.result()
+                    except (requests.RequestException, ValueError) as e:
+                        # Network failure or undecodable body; this video is retried next run
+                        logger.debug("skip %s: %s", video_url, e, exc_info=True)
+                        continue
+                    if not resp_json:
+                        continue
+                    
+                    try:
+                        captions = resp_json.get("captions") or []
+                        has_text = any(caption["text"].strip() for caption in captions)
+                    except (AttributeError, KeyError, TypeError) as e:
+                        logger.debug("skip %s: malformed response: %s", video_url, e, exc_info=True)
+                        continue
+                    
+                    try:
+                        # Empty or whitespace-only captions: remember the id so re-runs skip it
+                        if not has_text:
+                            no_captions.add(video_info.id)
+                            unflushed += 1
+                            if unflushed >= NO_CAPTIONS_FLUSH_EVERY:
+                                write_json_file(no_captions_file, sorted(no_captions))
+                                unflushed = 0
+                            continue
+                        
+                        # Create numbered folder (transcripts_dir already exists, so only the leaf is made)
+                        folder_name = str(i)
+                        video_folder = f"{transcripts_dir_s}{os.sep}{folder_name}"
+                        os.makedirs(video_folder, exist_ok=True)
+                        
+                        # Save transcript with a single low-level write
+                        filename = f"{video_folder}{os.sep}transcript.txt"
+                        transcript_text = " ".join(caption["text"] for caption in captions)
+                        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                        try:
+                            # os.write may write less than asked; keep going until every byte is out
+                            data = memoryview(transcript_text.encode("utf-8"))
+                            while data:
+                                data = data[os.write(fd, data):]
+                        finally:
+                            os.close(fd)
+                        
+                        # Add to metadata and checkpoint it so progress survives an interrupted run
+                        bisect.insort(metadata, (i, {
+                            "folder": folder_name,
+                            "id": video_info.id,
+                            "title": video_title,
+                            "url": video_url,
+                            "views": video_info.view_count,
+                            "upload_date": video_info.upload_date
+                        }))
+                        write_json_file(metadata_file, existing_metadata + [entry for _, entry in metadata])
+                    except OSError as e:
+                        # Disk errors (full, permissions) would fail every remaining video too
+                        st.error(f"❌ Could not write transcript for '{video_title}': {e}")
+                        write_failed = True
+                        break
+                    
+                    successful_transcripts += 1
                 
-            except Exception as e:
-                continue
-            
-            time.sleep(random.uniform(1, 3))
+                # Update progress at most every 200 ms (each call is a websocket message), but
+                # always on an idle poll so a Stop click is still picked up
+                now = time.monotonic()
+                if not done or not not_done or now - last_ui > 0.2:
+                    progress_bar.progress(completed / total_pending)
+                    status_text.text(f"Extracting transcripts: {completed}/{total_pending}")
+                    last_ui = now
+        finally:
+            # Drop queued requests on stop (or a Streamlit rerun) instead of draining them
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Save metadata
-        metadata_file = transcripts_dir / "metadata.json"
-        with open(metadata_file, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        write_json_file(metadata_file, existing_metadata + [entry for _, entry in metadata])
+        if unflushed:
+            write_json_file(no_captions_file, sorted(no_captions))
         
         progress_bar.progress(1.0)
         status_text.empty()
@@ -269,49 +475,74 @@ class YouTubeTranscriberApp:
         
         # Run transcription
         if st.session_state.yt_is_running:
+            # URLs can be cleared after Start; the length check above doesn't run again
+            if not channel_configs:
+                st.error("❌ No channel URLs to process")
+                st.session_state.yt_is_running = False
+                return
+            
             st.markdown("### 🚀 Processing Channels")
             
             transcriber = YouTubeTranscriber()
             project_path = st.session_state.current_project_path
             
-            for idx, config in enumerate(channel_configs):
-                st.write(f"**Channel {idx+1}/{len(channel_configs)}:** {config['url']}")
-                
-                try:
-                    # Extract videos
-                    with st.spinner(f"Extracting videos from channel {idx+1}..."):
-                        video_data = transcriber.extract_videos(
-                            config['url'],
-                            config['max_videos'],
+            # Channel listings are network-bound and independent, so they are all fetched in the
+            # background while earlier channels transcribe; transcription itself stays sequential
+            listing_executor = ThreadPoolExecutor(max_workers=min(len(channel_configs), 8))
+            listing_futures = [
+                listing_executor.submit(
+                    transcriber.extract_videos,
+                    config['url'],
+                    config['max_videos'],
+                    config['sort_by']
+                )
+                for config in channel_configs
+            ]
+            
+            try:
+                for idx, config in enumerate(channel_configs):
+                    st.write(f"**Channel {idx+1}/{len(channel_configs)}:** {config['url']}")
+                    
+                    try:
+                        # Extract videos
+                        with st.spinner(f"Extracting videos from channel {idx+1}..."):
+                            channel_name, video_data = listing_futures[idx].result()
+                        
+                        if not video_data:
+                            st.error(f"❌ No videos found in channel {idx+1}")
+                            continue
+                        
+                        st.info(f"✅ Found {len(video_data)} videos")
+                        
+                        # Flat listings don't always include view counts or upload dates; sorting is then skipped
+                        if config['sort_by'] == "Popularity" and not any(v.view_count for v in video_data):
+                            st.warning("⚠️ View counts not available in the channel listing, keeping listing order")
+                        elif config['sort_by'] == "Date" and not any(v.upload_date for v in video_data):
+                            st.warning("⚠️ Upload dates not available in the channel listing, keeping listing order (newest first on a channel's videos tab)")
+                        
+                        # Transcribe videos
+                        successful, total, channel_name, channel_path = transcriber.transcribe_videos(
+                            project_path,
+                            channel_name,
+                            video_data,
                             config['sort_by']
                         )
+                        
+                        if successful > 0:
+                            st.success(f"✅ Channel '{channel_name}': {successful}/{total} transcripts extracted")
+                            st.info(f"📁 Saved to: {channel_path}/transcripts/")
+                        else:
+                            st.warning(f"⚠️ Channel '{channel_name}': No transcripts extracted")
+                        
+                    except Exception as e:
+                        st.error(f"❌ Error processing channel {idx+1}: {e}")
                     
-                    if not video_data:
-                        st.error(f"❌ No videos found in channel {idx+1}")
-                        continue
-                    
-                    st.info(f"✅ Found {len(video_data)} videos")
-                    
-                    # Transcribe videos
-                    successful, total, channel_name, channel_path = transcriber.transcribe_videos(
-                        project_path,
-                        config['url'],
-                        video_data,
-                        config['sort_by']
-                    )
-                    
-                    if successful > 0:
-                        st.success(f"✅ Channel '{channel_name}': {successful}/{total} transcripts extracted")
-                        st.info(f"📁 Saved to: {channel_path}/transcripts/")
-                    else:
-                        st.warning(f"⚠️ Channel '{channel_name}': No transcripts extracted")
-                    
-                except Exception as e:
-                    st.error(f"❌ Error processing channel {idx+1}: {e}")
-                
-                if not st.session_state.yt_is_running:
-                    st.warning("⚠️ Stopped by user")
-                    break
+                    if not st.session_state.yt_is_running:
+                        st.warning("⚠️ Stopped by user")
+                        break
+            finally:
+                listing_executor.shutdown(wait=False, cancel_futures=True)
+                transcriber.close()
             
             st.balloons()
             st.session_state.yt_is_running = False